@@ -6,17 +6,23 @@ import argparse
 import logging
 import os
 from itertools import combinations
-from typing import Dict, Iterable, Tuple
+from typing import Dict, Iterable, List, Tuple
 
 import numpy as np
 import pandas as pd
-from sklearn.metrics import cohen_kappa_score
+
+try:  # Optional: compiled Krippendorff's alpha kernel for very large matrices
+    from numba import njit
+except ImportError:
+    njit = None
 
 from src.database import MongoDBClient
 from src.embedding_utils import setup_logging
 from src.config.settings import MONGO_URI as DEFAULT_MONGO_URI
 
 REQUIRED_FIELDS = {"question_id", "node_id", "relevance", "created_by"}
+# Size of the (categories x units) count matrix above which the numba kernel is used
+ALPHA_NUMBA_MIN_CELLS = 5_000_000
 
 
 def parse_args() -> argparse.Namespace:
@@ -64,110 +70,205 @@ def load_annotations(
     qrels_version: str | None,
     annotators: Iterable[str] | None,
 ) -> pd.DataFrame:
-    """Fetch qrels annotations as a DataFrame."""
+    """Fetch qrels annotations as a DataFrame.
+
+    Filtering and de-duplication run server-side: the pipeline keeps only the
+    most recently inserted label per (question_id, node_id, created_by).
+    """
     collection = client.get_collection(collection_name)
-    query: Dict[str, object] = {}
+    # The (qrels_version, created_by, question_id, node_id) index this match
+    # uses is built by bootstrap_qrels_from_ordered.py
+    query: Dict[str, object] = {"created_by": {"$ne": None}}
     if qrels_version:
         query["qrels_version"] = qrels_version
-    projection = {"_id": 0, "question_id": 1, "node_id": 1, "relevance": 1, "created_by": 1}
-    cursor = collection.find(query, projection)
-    df = pd.DataFrame(list(cursor))
-
-    if df.empty:
-        return df
-
-    missing = REQUIRED_FIELDS - set(df.columns)
-    if missing:
-        raise ValueError(f"Missing required fields in qrels documents: {missing}")
-
-    df = df.dropna(subset=["created_by"])
-
     if annotators:
-        annotators_set = {str(a) for a in annotators}
-        df = df[df["created_by"].astype(str).isin(annotators_set)]
-
-    # Normalize identifiers to string for consistent pivoting
-    df["question_id"] = df["question_id"].astype(str)
-    df["node_id"] = df["node_id"].astype(str)
-    df["created_by"] = df["created_by"].astype(str)
+        # Compare as strings so non-string created_by values still match
+        query["$expr"] = {
+            "$in": [{"$toString": "$created_by"}, sorted({str(a) for a in annotators})]
+        }
+    pipeline = [
+        {"$match": query},
+        {"$sort": {"_id": 1}},
+        {
+            "$group": {
+                "_id": {"q": "$question_id", "n": "$node_id", "c": "$created_by"},
+                "relevance": {"$last": "$relevance"},
+            }
+        },
+        {
+            "$project": {
+                "_id": 0,
+                "question_id": "$_id.q",
+                "node_id": "$_id.n",
+                "created_by": "$_id.c",
+                "relevance": 1,
+            }
+        },
+    ]
+    cursor = collection.aggregate(pipeline, allowDiskUse=True, batchSize=5000)
+
+    # Build the frame column-wise, normalizing identifiers to string for
+    # consistent pivoting, instead of materializing every document as a dict.
+    question_ids: List[str] = []
+    node_ids: List[str] = []
+    relevances: List[object] = []
+    created_by: List[str] = []
+    for doc in cursor:
+        missing = REQUIRED_FIELDS - doc.keys()
+        if missing:
+            raise ValueError(f"Missing required fields in qrels documents: {missing}")
+        question_ids.append(str(doc["question_id"]))
+        node_ids.append(str(doc["node_id"]))
+        relevances.append(doc["relevance"])
+        created_by.append(str(doc["created_by"]))
+
+    if not question_ids:
+        return pd.DataFrame()
 
-    df = df.drop_duplicates(["question_id", "node_id", "created_by"], keep="last")
+    df = pd.DataFrame(
+        {
+            "question_id": question_ids,
+            "node_id": node_ids,
+            "relevance": relevances,
+            "created_by": created_by,
+        }
+    )
     return df
 
 
 def build_annotation_matrix(df: pd.DataFrame) -> pd.DataFrame:
-    """Return pivot table indexed by (question_id, node_id) with annotators as columns."""
+    """Return matrix indexed by (question_id, node_id) with annotators as columns."""
     if df.empty:
         return pd.DataFrame()
 
-    pivot = df.pivot_table(
-        index=["question_id", "node_id"],
-        columns="created_by",
-        values="relevance",
-        aggfunc="first",
+    # load_annotations already de-duplicated (question, node, annotator)
+    # rows, so every cell is written at most once and no groupby is needed.
+    df = df[df["relevance"].notna()]
+    rows = pd.MultiIndex.from_arrays(
+        [df["question_id"], df["node_id"]], names=["question_id", "node_id"]
+    )
+    row_codes, row_labels = rows.factorize(sort=True)
+    col_codes, col_labels = pd.factorize(df["created_by"], sort=True)
+
+    values = np.full((len(row_labels), len(col_labels)), np.nan)
+    values[row_codes, col_codes] = df["relevance"].to_numpy(dtype=float)
+    return pd.DataFrame(
+        values,
+        index=row_labels.set_names(rows.names),
+        columns=pd.Index(col_labels, name="created_by"),
     )
-    pivot = pivot.sort_index()
-    return pivot
 
 
 def compute_pairwise_kappa(matrix: pd.DataFrame) -> Dict[Tuple[str, str], float]:
-    """Compute Cohen's kappa for each annotator pair using overlapping items."""
+    """Compute Cohen's kappa for each annotator pair using overlapping items.
+
+    Labels are integer-coded once; each pair's confusion matrix is then a
+    single bincount over the flattened (left, right) codes of the units both
+    annotators labelled, and kappa is derived from the counts as
+    (p_o - p_e) / (1 - p_e).
+    """
     if matrix.shape[1] < 2:
         return {}
 
+    values = matrix.to_numpy(dtype=float)
+    codes, categories = pd.factorize(values.ravel())  # NaN -> -1
+    codes = codes.reshape(values.shape)
+    n_categories = len(categories)
+    valid = codes >= 0
+
     results: Dict[Tuple[str, str], float] = {}
-    for left, right in combinations(matrix.columns, 2):
-        subset = matrix[[left, right]].dropna()
-        if subset.empty:
+    for i, j in combinations(range(values.shape[1]), 2):
+        overlap = valid[:, i] & valid[:, j]
+        n = int(overlap.sum())
+        if n == 0:
             continue
-        kappa = cohen_kappa_score(subset[left], subset[right])
-        results[(str(left), str(right))] = float(kappa)
+        counts = np.bincount(
+            codes[overlap, i] * n_categories + codes[overlap, j],
+            minlength=n_categories * n_categories,
+        ).reshape(n_categories, n_categories)
+        p_o = np.trace(counts) / n
+        p_e = (counts.sum(axis=1) @ counts.sum(axis=0)) / (n * n)
+        kappa = float("nan") if p_e == 1.0 else (p_o - p_e) / (1.0 - p_e)
+        results[(str(matrix.columns[i]), str(matrix.columns[j]))] = float(kappa)
     return results
 
 
-def krippendorffs_alpha_nominal(data: np.ndarray) -> float:
-    """Krippendorff's alpha for nominal data with missing values as NaN."""
+if njit is not None:
+
+    @njit(cache=True)
+    def _alpha_core(codes: np.ndarray, n_categories: int):
+        """Accumulate (Do_num, Do_den, N_c) from (raters x units) codes, -1 = missing."""
+        n_raters, n_units = codes.shape
+        category_totals = np.zeros(n_categories, dtype=np.int64)
+        unit_counts = np.zeros(n_categories, dtype=np.int64)
+        do_num = 0.0
+        do_den = 0.0
+        for u in range(n_units):
+            unit_counts[:] = 0
+            n_u = 0
+            for r in range(n_raters):
+                c = codes[r, u]
+                if c >= 0:
+                    unit_counts[c] += 1
+                    n_u += 1
+            for k in range(n_categories):
+                do_num += unit_counts[k] * (n_u - unit_counts[k])
+                category_totals[k] += unit_counts[k]
+            do_den += n_u * (n_u - 1)
+        return do_num, do_den, category_totals
+
+
+def krippendorffs_alpha_nominal(data: np.ndarray, units_axis: int = 1) -> float:
+    """Krippendorff's alpha for nominal data with missing values as NaN.
+
+    By default ``data`` is laid out as (raters x units); pass ``units_axis=0``
+    for a (units x raters) array such as the annotation matrix, which avoids a
+    transposed copy. Per-unit category counts are
+    accumulated into a single (categories x units) matrix so the disagreement
+    sums reduce to whole-array operations instead of a Python loop over units.
+    When numba is installed and that count matrix would exceed
+    ALPHA_NUMBA_MIN_CELLS, a compiled loop with O(categories) memory is used.
+    """
     if data.size == 0:
         return float("nan")
 
-    mask = ~np.isnan(data)
-    if mask.sum() == 0:
+    # Integer-code the labels once; NaN becomes -1
+    codes, categories = pd.factorize(data.ravel())
+    codes = codes.reshape(data.shape)
+    mask = codes >= 0
+    if not mask.any():
         return float("nan")
-
-    valid_values = data[mask]
-    categories = np.unique(valid_values)
-    if categories.size <= 1:
+    if len(categories) <= 1:
         return 1.0
 
-    counts_overall = {cat: 0.0 for cat in categories}
-    Do_num = 0.0
-    Do_den = 0.0
-
-    for unit_idx in range(data.shape[1]):
-        unit_mask = mask[:, unit_idx]
-        unit_vals = data[:, unit_idx][unit_mask]
-        if unit_vals.size == 0:
-            continue
-        unique_vals, counts = np.unique(unit_vals, return_counts=True)
-        n_u = float(unit_vals.size)
-        for cat, count in zip(unique_vals, counts):
-            counts_overall[cat] += float(count)
-            if n_u > 1:
-                Do_num += float(count) * (n_u - float(count))
-        if n_u > 1:
-            Do_den += n_u * (n_u - 1.0)
-
+    n_categories = len(categories)
+    n_units = data.shape[units_axis]
+    if njit is not None and n_categories * n_units >= ALPHA_NUMBA_MIN_CELLS:
+        coded = codes.T if units_axis == 0 else codes
+        Do_num, Do_den, counts_overall = _alpha_core(coded, n_categories)
+    else:
+        # Unit index of every labelled cell
+        unit_idx = np.nonzero(mask)[units_axis]
+        counts = np.zeros((n_categories, n_units), dtype=np.int64)
+        np.add.at(counts, (codes[mask], unit_idx), 1)
+
+        n_u = counts.sum(axis=0)
+        pairable = n_u > 1
+        Do_den = (n_u[pairable] * (n_u[pairable] - 1)).sum()
+        pairable_counts = counts[:, pairable]
+        Do_num = (pairable_counts * (n_u[pairable] - pairable_counts)).sum()
+        counts_overall = counts.sum(axis=1)
+
+    Do_den = float(Do_den)
     if Do_den == 0.0:
         return float("nan")
+    Do = float(Do_num) / Do_den
 
-    Do = Do_num / Do_den
-    total_annotations = sum(counts_overall.values())
+    total_annotations = float(counts_overall.sum())
     if total_annotations <= 1:
         return float("nan")
 
-    De_num = 0.0
-    for count in counts_overall.values():
-        De_num += count * (total_annotations - count)
+    De_num = float((counts_overall * (total_annotations - counts_overall)).sum())
     De = De_num / (total_annotations * (total_annotations - 1.0))
     if De == 0.0:
         return 1.0
@@ -207,7 +308,8 @@ def main() -> None:
         for (left, right), value in sorted(pairwise.items()):
             print(f"  {left} vs {right}: {value:.3f}")
 
-    alpha = krippendorffs_alpha_nominal(matrix.T.to_numpy(dtype=float))
+    # float32 holds the small integer labels exactly and halves the copy
+    alpha = krippendorffs_alpha_nominal(matrix.to_numpy(dtype=np.float32), units_axis=0)
     if np.isnan(alpha):
         logging.error("Could not compute Krippendorff's alpha (insufficient data).")
     else:
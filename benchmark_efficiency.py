@@ -5,7 +5,7 @@ Generates metrics_out/efficiency.csv with real performance data.
 
 Measures:
 - Query latency (median time to embed a search query)
-- Index size (approximate memory usage)
+- Index size (approximate memory usage as fp32, plus fp16 and int8 variants)
 - Build time (time to embed a batch of documents)
 """
 
@@ -15,98 +15,106 @@ import time
 import logging
 import statistics
 import sys
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import gc
 
+import numpy as np
+from joblib import Parallel, delayed
+
 from src import (
-    embed_text,
     MongoDBClient,
     EMBEDDING_MODEL,
-    get_embedding_model
+    EmbeddingModel,
 )
 from src.embedding_utils import setup_logging
 from src.embeddings.factory import EmbeddingModelFactory
 
 
-def measure_query_latency(model_name: str, test_queries: List[str], num_runs: int = 10) -> float:
+def measure_query_latency(model: EmbeddingModel, test_queries: List[str], num_runs: int = 10,
+                          num_warmup_runs: int = 3) -> float:
     """Measure median query latency for a model."""
-    logging.info(f"Measuring query latency for {model_name}...")
+    logging.info(f"Measuring query latency for {model.MODEL_ID}...")
+    
+    # Call the resolved model directly so samples time inference, not model lookup
+    embed_func = model.embed_text
     
-    # Get embedding function for this model
-    embed_func = lambda text: embed_text(text, model_name=model_name)
+    # Warm up; the first calls pay for kernel compilation and caches
+    for i in range(num_warmup_runs):
+        embed_func(test_queries[i % len(test_queries)])
     
-    # Warm up with one query
-    embed_func(test_queries[0])
+    # Collect once and keep the collector out of the timed region
+    gc.collect()
+    gc.disable()
     
     latencies = []
-    for i in range(num_runs):
-        query = test_queries[i % len(test_queries)]
-        
-        start_time = time.time()
-        embed_func(query)
-        end_time = time.time()
-        
-        latency_ms = (end_time - start_time) * 1000
-        latencies.append(latency_ms)
-        
-        # Force garbage collection to get consistent measurements
-        gc.collect()
+    try:
+        for i in range(num_runs):
+            query = test_queries[i % len(test_queries)]
+            
+            start_ns = time.perf_counter_ns()
+            embed_func(query)
+            latencies.append((time.perf_counter_ns() - start_ns) / 1e6)
+    finally:
+        gc.enable()
     
     median_latency = statistics.median(latencies)
     logging.info(f"  Median latency: {median_latency:.2f} ms")
+    if len(latencies) >= 2:
+        # Trimmed mean over the 10th-90th percentile band, plus p90 itself
+        deciles = statistics.quantiles(latencies, n=10)
+        trimmed = [lat for lat in latencies if deciles[0] <= lat <= deciles[-1]] or latencies
+        logging.info(f"  Trimmed mean: {statistics.fmean(trimmed):.2f} ms, p90: {deciles[-1]:.2f} ms")
     return median_latency
 
 
-def estimate_index_size(model_name: str, sample_texts: List[str]) -> float:
-    """Estimate index size by measuring memory usage of embeddings."""
-    logging.info(f"Estimating index size for {model_name}...")
-    
-    # Get embedding function for this model
-    embed_func = lambda text: embed_text(text, model_name=model_name)
-    
-    # Generate embeddings for sample texts
-    embeddings = []
-    for text in sample_texts:
-        embedding = embed_func(text)
-        embeddings.append(embedding)
+def embed_documents(model: EmbeddingModel, texts: List[str], batch_size: int = 32) -> List[List[float]]:
+    """Embed documents with batched forward passes."""
+    return model.embed_batch(texts, batch_size=batch_size)
+
+
+# Bytes per vector component for the storage formats reported in efficiency.csv
+INDEX_DTYPE_BYTES = {"fp32": 4, "fp16": 2, "int8": 1}
+
+
+def estimate_index_size(model: EmbeddingModel, embeddings: np.ndarray) -> Dict[str, float]:
+    """Estimate index size in MB for fp32, fp16 and int8 storage of already computed embeddings."""
+    logging.info(f"Estimating index size for {model.MODEL_ID}...")
     
-    # Estimate size per embedding (in bytes)
-    if embeddings:
-        import numpy as np
-        sample_embedding = np.array(embeddings[0])
-        bytes_per_embedding = sample_embedding.nbytes
-        dimension = len(sample_embedding)
+    # Estimate size per embedding (in bytes) from the dimension, so the figure
+    # reflects the stored dtype rather than whatever the model returned
+    if embeddings.size:
+        dimension = embeddings.shape[1]
         
         # Estimate for 1000 documents (typical small database)
         estimated_docs = 1000
-        total_bytes = estimated_docs * bytes_per_embedding
-        size_mb = total_bytes / (1024 * 1024)
+        sizes_mb = {
+            dtype: estimated_docs * dimension * nbytes / (1024 * 1024)
+            for dtype, nbytes in INDEX_DTYPE_BYTES.items()
+        }
         
         logging.info(f"  Embedding dimension: {dimension}")
-        logging.info(f"  Estimated index size: {size_mb:.1f} MB (for {estimated_docs} docs)")
-        return size_mb
+        logging.info(
+            f"  Estimated index size: {sizes_mb['fp32']:.1f} MB fp32, {sizes_mb['fp16']:.1f} MB fp16, "
+            f"{sizes_mb['int8']:.1f} MB int8 (for {estimated_docs} docs)"
+        )
+        return sizes_mb
     
-    return 0.0
+    return {dtype: 0.0 for dtype in INDEX_DTYPE_BYTES}
 
 
-def measure_build_time(model_name: str, sample_texts: List[str]) -> float:
-    """Measure time to embed a batch of documents."""
-    logging.info(f"Measuring build time for {model_name}...")
+def measure_build_time(model: EmbeddingModel, sample_texts: List[str]) -> Tuple[float, np.ndarray]:
+    """Measure time to embed a batch of documents; also returns the embeddings as float32."""
+    logging.info(f"Measuring build time for {model.MODEL_ID}...")
     
-    # Get embedding function for this model
-    embed_func = lambda text: embed_text(text, model_name=model_name)
+    start_time = time.perf_counter()
     
-    start_time = time.time()
+    # Embed all sample texts in batches
+    embeddings = embed_documents(model, sample_texts)
     
-    # Embed all sample texts
-    for text in sample_texts:
-        embed_func(text)
-    
-    end_time = time.time()
-    build_time = end_time - start_time
+    build_time = time.perf_counter() - start_time
     
     logging.info(f"  Build time: {build_time:.2f} s for {len(sample_texts)} documents")
-    return build_time
+    return build_time, np.asarray(embeddings, dtype=np.float32)
 
 
 def get_sample_data() -> tuple[List[str], List[str]]:
@@ -172,19 +180,26 @@ def benchmark_model(model_name: str, test_queries: List[str], sample_docs: List[
     logging.info(f"{'='*50}")
     
     try:
-        # Measure query latency
-        median_latency = measure_query_latency(model_name, test_queries, num_runs=5)
+        # Resolve and load the model once. get_embedding_model() keeps a single
+        # process-wide instance, so it would hand back the previously benchmarked model.
+        model = EmbeddingModelFactory.create_model(model_name)
+        model.load_with_retry()
         
-        # Estimate index size  
-        index_size = estimate_index_size(model_name, sample_docs[:5])  # Use fewer docs for speed
+        # Measure query latency
+        median_latency = measure_query_latency(model, test_queries, num_runs=5)
         
         # Measure build time
-        build_time = measure_build_time(model_name, sample_docs[:5])  # Use fewer docs for speed
+        build_time, embeddings = measure_build_time(model, sample_docs[:5])  # Use fewer docs for speed
+        
+        # Estimate index size from the same embeddings instead of embedding the docs again
+        index_sizes = estimate_index_size(model, embeddings)
         
         return {
             "model": model_name,
             "median_latency_ms": round(median_latency, 2),
-            "index_size_mb": round(index_size, 2),
+            "index_size_mb": round(index_sizes["fp32"], 2),
+            "index_size_mb_fp16": round(index_sizes["fp16"], 2),
+            "index_size_mb_int8": round(index_sizes["int8"], 2),
             "build_time_s": round(build_time, 2)
         }
         
@@ -193,6 +208,12 @@ def benchmark_model(model_name: str, test_queries: List[str], sample_docs: List[
         return None
 
 
+def _benchmark_model_worker(model_name: str, test_queries: List[str], sample_docs: List[str]) -> Dict[str, float]:
+    """Run benchmark_model in a worker process, which needs its own logging setup."""
+    setup_logging()
+    return benchmark_model(model_name, test_queries, sample_docs)
+
+
 def main():
     """Main benchmarking function."""
     setup_logging()
@@ -213,13 +234,18 @@ def main():
     available_models = EmbeddingModelFactory.list_available_models()
     logging.info(f"Available models: {', '.join(available_models)}")
     
-    # Benchmark each model
-    results = []
+    # Each model is benchmarked in its own process with its own weights and
+    # device context. Models run one after another by default: concurrent runs
+    # compete for the same CPU/GPU, which skews the timings (and can exhaust
+    # GPU memory), so only raise BENCHMARK_JOBS for quick smoke runs.
+    n_jobs = int(os.getenv("BENCHMARK_JOBS", "1"))
+    logging.info(f"Running benchmarks with {n_jobs} worker(s)")
     
-    for model_name in available_models:
-        result = benchmark_model(model_name, test_queries, sample_docs)
-        if result:
-            results.append(result)
+    results = Parallel(n_jobs=n_jobs, backend="loky")(
+        delayed(_benchmark_model_worker)(model_name, test_queries, sample_docs)
+        for model_name in available_models
+    )
+    results = [result for result in results if result]
     
     if not results:
         logging.error("No successful benchmarks completed")
@@ -227,12 +253,12 @@ def main():
     
     # Write results to CSV
     with open(output_file, 'w', newline='', encoding='utf-8') as f:
-        fieldnames = ["model", "median_latency_ms", "index_size_mb", "build_time_s"]
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        fieldnames = ["model", "median_latency_ms", "index_size_mb", "index_size_mb_fp16",
+                      "index_size_mb_int8", "build_time_s"]
+        writer = csv.writer(f)
         
-        writer.writeheader()
-        for result in results:
-            writer.writerow(result)
+        writer.writerow(fieldnames)
+        writer.writerows([tuple(result[field] for field in fieldnames) for result in results])
     
     logging.info(f"\n{'='*50}")
     logging.info(f"Benchmarking complete! Results written to {output_file}")
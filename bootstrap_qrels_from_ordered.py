@@ -1,37 +1,17 @@
-import os, sys, time
+import atexit, os, sys, time
+from collections import defaultdict
 from datetime import datetime, timezone
-from typing import Any, Dict, List
-from pymongo import MongoClient
+from typing import Any, Dict, List, Tuple
+from pymongo import MongoClient, UpdateOne
 
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
 DB = os.getenv("DB", "oncopro")
 TOP_R = int(os.getenv("TOP_R", "3"))
 QRELS_VERSION = os.getenv("QRELS_VERSION", "v1")
 CREATED_BY = os.getenv("CREATED_BY", "bootstrap")
-
-def get_node_id(x: Any) -> str | None:
-    """Extract node_id from OrderedNodeRecord, SavedNode, or raw id string."""
-    if x is None:
-        return None
-    if isinstance(x, str):
-        return x
-    if isinstance(x, dict):
-        # OrderedNodeRecord: { node: string|SavedNode, original_index: int }
-        if "node" in x:
-            n = x["node"]
-            if isinstance(n, str):
-                return n
-            if isinstance(n, dict):
-                if "id" in n:
-                    return str(n["id"])
-                if "_id" in n:
-                    return str(n["_id"])
-        # Embedded SavedNode or legacy
-        if "id" in x:
-            return str(x["id"])
-        if "_id" in x:
-            return str(x["_id"])
-    return None
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+# Wire compression for the large answers payloads; zlib needs no extra package
+MONGO_COMPRESSORS = [c for c in os.getenv("MONGO_COMPRESSORS", "zlib").split(",") if c]
 
 def get_original_index(x: Any) -> int | None:
     """Extract original_index from OrderedNodeRecord. Returns -1 for manually added nodes."""
@@ -65,44 +45,75 @@ def is_manually_added(x: Any) -> bool:
     
     return False
 
-def is_marked_duplicate(x: Any) -> bool:
-    """True if the element itself or its nested node carries isDuplicate=True."""
-    if not isinstance(x, dict):
-        return False
-    if x.get("isDuplicate") is True:
-        return True
-    n = x.get("node")
-    if isinstance(n, dict) and n.get("isDuplicate") is True:
-        return True
-    return False
+def classify_element(x: Any) -> Tuple[str | None, str]:
+    """Resolve node_id and duplicate/irrelevant status in a single walk of the element.
 
-def is_marked_irrelevant(x: Any) -> bool:
-    """True if the element itself or its nested node carries isIrrelevant=True."""
+    Accepts an OrderedNodeRecord ({ node: string|SavedNode, original_index: int }),
+    an embedded SavedNode, or a raw id string. A node is duplicate/irrelevant
+    when the element itself or its nested node carries isDuplicate/isIrrelevant=True.
+    Returns (node_id, status) where status is "duplicate", "irrelevant" or "ok".
+    """
     if not isinstance(x, dict):
-        return False
-    if x.get("isIrrelevant") is True:
-        return True
-    n = x.get("node")
-    if isinstance(n, dict) and n.get("isIrrelevant") is True:
-        return True
-    return False
+        return (x if isinstance(x, str) else None), "ok"
 
-client = MongoClient(MONGO_URI)
+    n = x.get("node")
+    n_is_dict = isinstance(n, dict)
+    if x.get("isDuplicate") is True or (n_is_dict and n.get("isDuplicate") is True):
+        return None, "duplicate"
+
+    if isinstance(n, str):
+        nid = n
+    elif n_is_dict and "id" in n:
+        nid = str(n["id"])
+    elif n_is_dict and "_id" in n:
+        nid = str(n["_id"])
+    elif "id" in x:
+        nid = str(x["id"])
+    elif "_id" in x:
+        nid = str(x["_id"])
+    else:
+        nid = None
+
+    if x.get("isIrrelevant") is True or (n_is_dict and n.get("isIrrelevant") is True):
+        return nid, "irrelevant"
+    return nid, "ok"
+
+# Fail fast when the server is unreachable instead of waiting out the 30 s default
+client = MongoClient(
+    MONGO_URI,
+    compressors=MONGO_COMPRESSORS,
+    serverSelectionTimeoutMS=5000,
+    connectTimeoutMS=10000,
+)
+atexit.register(client.close)
 db = client[DB]
 answers = db["answers"]
 qrels = db["qrels"]
 
 qrels.create_index([("question_id", 1), ("node_id", 1), ("qrels_version", 1)], unique=True)
-
+# Covers the preload of existing relevance for one qrels_version below
+qrels.create_index([("qrels_version", 1), ("question_id", 1), ("node_id", 1), ("relevance", 1)])
+# Serves agreement_metrics.py: version and annotator filters first, then the
+# (question, node) keys it groups on
+qrels.create_index([("qrels_version", 1), ("created_by", 1), ("question_id", 1), ("node_id", 1)])
+
+# No index is built for the answers scan below: a $or only uses indexes when
+# every branch is indexable, and the ordered_nodes branch would need an index
+# keyed on the (large) first array element. The scan is a collection scan,
+# kept cheap by the projection.
 # also accept answers that have an ordered list even if completed is false
-cursor = answers.find({
-    "$or": [
-        {"completed": True},
-        {"ordered_nodes": {"$exists": True, "$ne": []}}
-    ]
-})
-
-per_q: Dict[str, Dict[str, int]] = {}
+cursor = answers.find(
+    {
+        "$or": [
+            {"completed": True},
+            {"ordered_nodes.0": {"$exists": True}}
+        ]
+    },
+    # Only the id fields and node lists are read below; skip the rest of the payload
+    {"_id": 1, "question_id": 1, "question": 1, "id": 1, "ordered_nodes": 1, "nodes": 1},
+).batch_size(200)
+
+per_q: Dict[str, Dict[str, int]] = defaultdict(dict)
 kept_cnt = skipped_dup_flag = skipped_repeat_id = skipped_irrelevant = manually_added_cnt = 0
 
 for a in cursor:
@@ -116,55 +127,92 @@ for a in cursor:
     ranked_unique_ids: List[str] = []
     irrelevant_ids: List[str] = []
 
-    for elem in items:
-        # Skip anything explicitly marked duplicate
-        if is_marked_duplicate(elem):
-            skipped_dup_flag += 1
-            continue
+    if all(isinstance(elem, str) for elem in items):
+        # Plain id lists carry no duplicate/irrelevant/manual flags, so
+        # de-duplicating the non-empty ids (first occurrence wins) is all that's needed
+        present = [nid for nid in items if nid]
+        ranked_unique_ids = list(dict.fromkeys(present))
+        skipped_repeat_id += len(present) - len(ranked_unique_ids)
+        kept_cnt += len(ranked_unique_ids)
+    else:
+        for elem in items:
+            nid, status = classify_element(elem)
+
+            # Skip anything explicitly marked duplicate
+            if status == "duplicate":
+                skipped_dup_flag += 1
+                continue
         
-        nid = get_node_id(elem)
-        if not nid:
-            continue
+            if not nid:
+                continue
             
-        # Skip repeats of the same node_id within this answer
-        if nid in seen_ids:
-            skipped_repeat_id += 1
-            continue
+            # Skip repeats of the same node_id within this answer
+            if nid in seen_ids:
+                skipped_repeat_id += 1
+                continue
             
-        seen_ids.add(nid)
+            seen_ids.add(nid)
         
-        # Track manually added nodes
-        if is_manually_added(elem):
-            manually_added_cnt += 1
+            # Track manually added nodes
+            if is_manually_added(elem):
+                manually_added_cnt += 1
         
-        # Check if marked as irrelevant
-        if is_marked_irrelevant(elem):
-            irrelevant_ids.append(nid)
-            skipped_irrelevant += 1
-        else:
-            ranked_unique_ids.append(nid)
-            kept_cnt += 1
+            # Check if marked as irrelevant
+            if status == "irrelevant":
+                irrelevant_ids.append(nid)
+                skipped_irrelevant += 1
+            else:
+                ranked_unique_ids.append(nid)
+                kept_cnt += 1
 
     # Assign relevance based on your requirements:
     # - Relevant nodes (rank 1-3): +1 point each  
     # - Relevant nodes (rank 4+): 0 points
     # - Irrelevant nodes: -1 point each
-    rel_map = per_q.setdefault(qid, {})
+    rel_map = per_q[qid]
     
-    for rank, nid in enumerate(ranked_unique_ids, start=1):
-        rel = 1 if rank <= TOP_R else 0
-        # Take the max across multiple models / answers
-        rel_map[nid] = max(rel_map.get(nid, 0), rel)
+    # Take the max across multiple models / answers: 1 is the top grade, so
+    # the top ranks are set outright, and the rest only lift a missing or -1 entry
+    for nid in ranked_unique_ids[:TOP_R]:
+        rel_map[nid] = 1
+    for nid in ranked_unique_ids[TOP_R:]:
+        if rel_map.get(nid, -1) < 0:
+            rel_map[nid] = 0
     
     # Mark irrelevant nodes with negative relevance (-1)
     for nid in irrelevant_ids:
         # Always set to -1 for irrelevant nodes, regardless of other model ratings
         rel_map[nid] = -1
 
+# Relevance already stored for this version, so re-runs only send the rows
+# whose grade actually changes
+existing: Dict[Tuple[Any, Any], Any] = {
+    (d.get("question_id"), d.get("node_id")): d.get("relevance")
+    for d in qrels.find(
+        {"qrels_version": QRELS_VERSION},
+        {"_id": 0, "question_id": 1, "node_id": 1, "relevance": 1},
+    ).batch_size(5000)
+}
+
 now = datetime.now(timezone.utc)
-inserted = updated = 0
+inserted = updated = unchanged = 0
+ops: List[UpdateOne] = []
+
+def flush_ops() -> None:
+    """Send the pending upserts in one unordered bulk write."""
+    global inserted, updated
+    if not ops:
+        return
+    res = qrels.bulk_write(ops, ordered=False)
+    inserted += res.upserted_count
+    updated += res.matched_count
+    ops.clear()
+
 for qid, rels in per_q.items():
     for nid, rel in rels.items():
+        if existing.get((qid, nid)) == rel:
+            unchanged += 1
+            continue
         insert_doc = {
             "question_id": qid,
             "node_id": nid,
@@ -173,16 +221,17 @@ for qid, rels in per_q.items():
             "created_by": CREATED_BY,
         }
         update_doc = {"relevance": int(rel), "updated_at": now}
-        res = qrels.update_one(
+        ops.append(UpdateOne(
             {"question_id": qid, "node_id": nid, "qrels_version": QRELS_VERSION},
             {"$setOnInsert": insert_doc, "$set": update_doc},
             upsert=True,
-        )
-        if res.upserted_id: inserted += 1
-        else: updated += 1
+        ))
+        if len(ops) >= BULK_BATCH_SIZE:
+            flush_ops()
+flush_ops()
 
 print(
-    f"qrels bootstrap done: upserts={inserted}, updated={updated}, "
+    f"qrels bootstrap done: upserts={inserted}, updated={updated}, unchanged={unchanged}, "
     f"questions={len(per_q)}, kept={kept_cnt}, "
     f"skipped_dup_flag={skipped_dup_flag}, skipped_repeat_id={skipped_repeat_id}, "
     f"skipped_irrelevant={skipped_irrelevant}, manually_added={manually_added_cnt}"
@@ -19,19 +19,24 @@ Usage examples:
   python compute_metrics.py --model-include "jina|Qwen" --outdir results_ir
 
 Requires:
-  pip install pymongo numpy
+  pip install pymongo numpy pandas
 """
 
 import os
 import re
-import csv
 import math
 import argparse
 from collections import defaultdict
 from typing import Dict, List, Tuple
 import numpy as np
+import pandas as pd
 from pymongo import MongoClient
 
+try:  # Optional: compiled per-query evaluator for large, ragged run sets
+    from numba import njit
+except ImportError:
+    njit = None
+
 
 def parse_args():
     p = argparse.ArgumentParser(description="Compute IR metrics from qrels and runs")
@@ -52,52 +57,21 @@ def parse_args():
     return p.parse_args()
 
 
-# -------------------- Metric helpers --------------------
-
-def dcg_at_k(rels: List[int], k: int) -> float:
-    # Graded DCG (2^rel - 1) / log2(rank+1)
-    upto = min(k, len(rels))
-    return sum(((2 ** rels[i] - 1) / math.log2(i + 2)) for i in range(upto))
-
-
-def ndcg_at_k(rels: List[int], k: int) -> float:
-    if not rels:
-        return 0.0
-    ideal = sorted(rels, reverse=True)
-    idcg = dcg_at_k(ideal, k)
-    if idcg == 0:
-        return 0.0
-    return dcg_at_k(rels, k) / idcg
-
-
-def precision_at_k(rels: List[int], k: int, pos_min: int) -> float:
-    hits = sum(1 for r in rels[:k] if r >= pos_min)
-    return hits / float(k)
-
-
-def recall_at_k(rels: List[int], k: int, total_rel: int, pos_min: int) -> float:
-    hits = sum(1 for r in rels[:k] if r >= pos_min)
-    return (hits / float(total_rel)) if total_rel > 0 else 0.0
-
-
-def mrr(rels: List[int], pos_min: int) -> float:
-    for i, r in enumerate(rels, start=1):
-        if r >= pos_min:
-            return 1.0 / i
-    return 0.0
+# Relevance grades are stored as int8; the lowest value pads short rankings
+PAD_REL = np.iinfo(np.int8).min
+# DCG gain (2^rel - 1) per int8 grade, indexed by the grade's uint8 bit pattern
+# so a uint8 view of the relevance matrix can index it directly; padding has no gain
+GAIN_LUT = (np.exp2(np.arange(256, dtype=np.uint8).view(np.int8).astype(np.float64)) - 1.0).astype(np.float32)
+GAIN_LUT[np.uint8(PAD_REL & 0xFF)] = 0.0
 
-
-def average_precision(rels: List[int], pos_min: int) -> float:
-    num_rel = sum(1 for r in rels if r >= pos_min)
-    if num_rel == 0:
-        return 0.0
-    hits = 0
-    ap = 0.0
-    for i, r in enumerate(rels, start=1):
-        if r >= pos_min:
-            hits += 1
-            ap += hits / float(i)
-    return ap / float(num_rel)
+# Largest (bootstrap x queries) multinomial weight matrix built in one go;
+# beyond this the bootstrap resamples query indices in batches instead
+BOOTSTRAP_MAX_WEIGHT_CELLS = 20_000_000
+# Target element count of each (batch x queries x metrics) gather in that path
+BOOTSTRAP_GATHER_CELLS = 10_000_000
+# Size of the padded (queries x rank) relevance matrix above which the numba
+# evaluator walks the unpadded rankings instead
+EVAL_NUMBA_MIN_CELLS = 5_000_000
 
 
 # -------------------- Data loading --------------------
@@ -105,7 +79,11 @@ def average_precision(rels: List[int], pos_min: int) -> float:
 def load_qrels(db, qrels_version: str) -> Dict[str, Dict[str, int]]:
     """Return dict: question_id -> {node_id: relevance}"""
     qrels_by_q: Dict[str, Dict[str, int]] = defaultdict(dict)
-    cur = db["qrels"].find({"qrels_version": qrels_version})
+    cur = db["qrels"].find(
+        {"qrels_version": qrels_version},
+        {"_id": 0, "question_id": 1, "node_id": 1, "relevance": 1},
+        batch_size=5000,
+    )
     count = 0
     for r in cur:
         qid = str(r["question_id"])
@@ -126,42 +104,75 @@ def load_runs(db,
     """
     Return dict: model_name -> question_id -> list of (rank, node_id) sorted by rank.
     De-duplicates node_id within each (model, question), keeping the earliest rank.
-    """
-    inc_re = re.compile(model_include) if model_include else None
-    exc_re = re.compile(model_exclude) if model_exclude else None
-
-    runs_by_mq: Dict[str, Dict[str, List[Tuple[int, str]]]] = defaultdict(lambda: defaultdict(list))
 
+    Model filtering and de-duplication run server-side, so only one row per
+    (model, question, node) is transferred.
+    """
+    # A missing or empty model_name counts as "unknown", so the filters are
+    # applied to that name for those rows
+    model_filter = {}
+    if model_include:
+        model_filter["$regex"] = model_include
+    if model_exclude:
+        model_filter["$not"] = re.compile(model_exclude)
+    match = {}
+    if model_filter:
+        keep_unknown = ((not model_include or re.search(model_include, "unknown"))
+                        and not (model_exclude and re.search(model_exclude, "unknown")))
+        if keep_unknown:
+            match = {"$or": [{"model_name": model_filter}, {"model_name": {"$in": [None, ""]}}]}
+        else:
+            match = {"model_name": {**model_filter, "$nin": [None, ""]}}
+
+    # The match and the first sort run on the raw fields, so both are served by
+    # the (model_name, question_id, rank, _id) index that
+    # flatten_runs_from_answers.py builds; names are normalized only afterwards
     cur = db["runs"].aggregate([
-        {"$sort": {"model_name": 1, "question_id": 1, "rank": 1}}
-    ])
-
+        {"$match": match},
+        # a missing rank sorts like null, i.e. first
+        {"$sort": {"model_name": 1, "question_id": 1, "rank": 1, "_id": 1}},
+        # a missing rank becomes an explicit null so $first keeps it
+        {"$project": {"model_name": {"$cond": [{"$eq": [{"$ifNull": ["$model_name", ""]}, ""]},
+                                               "unknown", "$model_name"]},
+                      "question_id": 1, "node_id": 1,
+                      "rank": {"$ifNull": ["$rank", None]}}},
+        {"$group": {
+            "_id": {"m": "$model_name", "q": "$question_id", "n": "$node_id"},
+            "model_name": {"$first": "$model_name"},
+            "question_id": {"$first": "$question_id"},
+            "node_id": {"$first": "$node_id"},
+            "rank": {"$first": "$rank"},
+            # insertion order breaks rank ties, as the unsorted scan used to
+            "first_id": {"$first": "$_id"},
+            "copies": {"$sum": 1},
+        }},
+        # a kept row without a rank is ordered last, as if it were 10**9
+        {"$addFields": {"rank": {"$ifNull": ["$rank", 10**9]}}},
+        {"$sort": {"model_name": 1, "question_id": 1, "rank": 1, "first_id": 1}},
+    ], allowDiskUse=True, batchSize=5000)
+
+    runs_by_key: Dict[Tuple[str, str], List[Tuple[int, str]]] = {}
     total_rows = 0
     kept_rows = 0
     for row in cur:
-        total_rows += 1
-        model = row.get("model_name") or "unknown"
-        if inc_re and not inc_re.search(model):
-            continue
-        if exc_re and exc_re.search(model):
-            continue
-
+        total_rows += row["copies"]
+        model = row["model_name"]
         qid = str(row["question_id"])
         nid = str(row["node_id"])
-        rank = int(row.get("rank", 10**9))
-
-        # de-duplicate by node_id within (model, question)
-        existing = runs_by_mq[model][qid]
-        if any(nid == n for _, n in existing):
-            continue
+        rank = int(row["rank"])
 
-        runs_by_mq[model][qid].append((rank, nid))
+        key = (model, qid)
+        ranked = runs_by_key.get(key)
+        if ranked is None:
+            ranked = runs_by_key[key] = []
+        ranked.append((rank, nid))
         kept_rows += 1
 
-    # Ensure lists are sorted by rank
-    for model, qmap in runs_by_mq.items():
-        for qid in qmap:
-            qmap[qid].sort(key=lambda x: x[0])
+    # Rows arrive in (model, question, rank) order, so every list is already
+    # rank-sorted; regroup into the model -> question shape once at the end
+    runs_by_mq: Dict[str, Dict[str, List[Tuple[int, str]]]] = {}
+    for (model, qid), ranked in runs_by_key.items():
+        runs_by_mq.setdefault(model, {})[qid] = ranked
 
     print(f"[INFO] Loaded runs: {total_rows} rows -> {kept_rows} kept after de-dup.")
     print(f"[INFO] Models found: {len(runs_by_mq)}")
@@ -170,68 +181,203 @@ def load_runs(db,
 
 # -------------------- Evaluation --------------------
 
-def evaluate_per_query(ranked_node_ids: List[str],
-                       qrels_lookup: Dict[str, int],
-                       k_list: List[int],
-                       pos_min: int) -> Dict[str, float]:
+def metric_names(k_list: List[int]) -> List[str]:
+    """Column order of the per-query score matrix returned by evaluate_queries."""
+    return [f"P@{k}" for k in k_list] + \
+           [f"Recall@{k}" for k in k_list] + \
+           [f"NDCG@{k}" for k in k_list] + ["MRR", "MAP"]
+
+
+if njit is not None:
+
+    @njit(cache=True)
+    def _evaluate_core(rels, offsets, totals, k_arr, pos_min, gain_lut, discounts):
+        """Per-query metrics from concatenated int8 rankings; row q is rels[offsets[q]:offsets[q+1]].
+
+        Mirrors the padded NumPy path in evaluate_queries, including float32 DCG sums.
+        """
+        n_queries = len(offsets) - 1
+        n_k = len(k_arr)
+        max_k = k_arr[n_k - 1]
+        out = np.zeros((n_queries, 3 * n_k + 2))
+        for q in range(n_queries):
+            row = rels[offsets[q]:offsets[q + 1]]
+            n = len(row)
+            ideal = np.sort(row)[::-1]
+            width = max(n, max_k)
+            dcg = np.float32(0.0)
+            idcg = np.float32(0.0)
+            hits = 0
+            first_hit = 0
+            ap_sum = 0.0
+            j = 0
+            for pos in range(width):
+                if pos < n:
+                    r = row[pos]
+                    ir = ideal[pos]
+                    dcg += gain_lut[r + 256 if r < 0 else r] * discounts[pos]
+                    idcg += gain_lut[ir + 256 if ir < 0 else ir] * discounts[pos]
+                    if r >= pos_min:
+                        hits += 1
+                        ap_sum += hits / (pos + 1)
+                        if first_hit == 0:
+                            first_hit = pos + 1
+                while j < n_k and k_arr[j] == pos + 1:
+                    out[q, j] = hits / k_arr[j]
+                    out[q, n_k + j] = hits / totals[q]
+                    if idcg != 0:
+                        out[q, 2 * n_k + j] = dcg / idcg
+                    j += 1
+            if first_hit > 0:
+                out[q, 3 * n_k] = 1.0 / first_hit
+                out[q, 3 * n_k + 1] = ap_sum / hits
+        return out
+
+
+def evaluate_queries(q2ranked: Dict[str, List[Tuple[int, str]]],
+                     qrels_by_q: Dict[str, Dict[str, int]],
+                     total_rel_by_q: Dict[str, int],
+                     k_list: List[int],
+                     pos_min: int) -> Tuple[List[str], np.ndarray]:
     """
-    ranked_node_ids: node ids in rank order (unique per question)
-    qrels_lookup: node_id -> relevance
+    Evaluate all queries of one model in a single pass over a padded
+    (queries x rank) relevance matrix.
+
+    q2ranked: question_id -> list of (rank, node_id) sorted by rank, unique node ids per question
+    qrels_by_q: question_id -> {node_id: relevance}
+    total_rel_by_q: question_id -> number of qrels with relevance >= pos_min
+
+    Returns (question_ids, scores) where scores has one row per evaluated query
+    and columns in metric_names(k_list) order. Queries without qrels, or whose
+    qrels have no relevant node, are left out (standard IR practice).
+
+    All cutoffs are read off cumulative sums over the ranking:
+      NDCG@k  graded DCG (2^rel - 1) / log2(rank+1), normalized by the DCG of
+              the same relevances in descending order
+      P@k     hits in top k / k
+      Recall@k hits in top k / relevant in qrels
+      MRR     1 / rank of the first hit
+      MAP     mean of P@rank over the ranks of the retrieved hits
+    A hit is rel >= pos_min.
+
+    When numba is installed and the padded matrix would exceed
+    EVAL_NUMBA_MIN_CELLS, a compiled loop over the unpadded rankings is used.
     """
-    rels = [int(qrels_lookup.get(nid, 0)) for nid in ranked_node_ids]
-    total_rel = sum(1 for v in qrels_lookup.values() if v >= pos_min)
-
-    # If this query has no relevant documents in qrels, we skip it in aggregation
-    if total_rel == 0:
-        return {"_skip": 1}
-
-    out = {}
-    for k in k_list:
-        out[f"P@{k}"] = precision_at_k(rels, k, pos_min)
-        out[f"Recall@{k}"] = recall_at_k(rels, k, total_rel, pos_min)
-        out[f"NDCG@{k}"] = ndcg_at_k(rels, k)
-    out["MRR"] = mrr(rels, pos_min)
-    out["MAP"] = average_precision(rels, pos_min)
-    out["_skip"] = 0
-    return out
-
-
-def aggregate_with_ci(per_query_rows: List[Dict[str, float]],
+    qids: List[str] = []
+    rel_rows: List[List[int]] = []
+    totals: List[int] = []
+    for qid, ranked_pairs in q2ranked.items():
+        # Skip queries that lack qrels entirely or have no relevant in qrels
+        total_rel = total_rel_by_q.get(qid, 0)
+        if total_rel == 0:
+            continue
+        qrels_lookup = qrels_by_q[qid]
+
+        ranked_node_ids = [nid for _, nid in ranked_pairs]
+        qids.append(qid)
+        rel_rows.append([int(qrels_lookup.get(nid, 0)) for nid in ranked_node_ids])
+        totals.append(total_rel)
+
+    n_metrics = 3 * len(k_list) + 2
+    if not qids:
+        return qids, np.empty((0, n_metrics))
+
+    # Pad to a common width that also covers the largest cutoff. Padding uses
+    # a sentinel below any real grade so it sorts after real (possibly
+    # negative) grades in the ideal ranking, and it contributes no gain.
+    width = max(max(len(row) for row in rel_rows), max(k_list))
+    positions = np.arange(1, width + 1)
+    discounts = (1.0 / np.log2(positions + 1)).astype(np.float32)
+
+    if njit is not None and len(qids) * width >= EVAL_NUMBA_MIN_CELLS:
+        lengths = np.fromiter((len(row) for row in rel_rows), dtype=np.int64, count=len(rel_rows))
+        offsets = np.zeros(len(rel_rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        rels = np.fromiter((rel for row in rel_rows for rel in row), dtype=np.int8, count=offsets[-1])
+        scores = _evaluate_core(rels, offsets, np.asarray(totals, dtype=np.float64),
+                                np.asarray(k_list, dtype=np.int64), pos_min, GAIN_LUT, discounts)
+        return qids, scores
+
+    R = np.full((len(qids), width), PAD_REL, dtype=np.int8)
+    for i, row in enumerate(rel_rows):
+        R[i, :len(row)] = row
+    total_rel = np.asarray(totals, dtype=np.float64)
+
+    # DCG runs in float32 with table-lookup gains; counts stay in float64.
+    # NDCG is only read at the cutoffs, so DCG and IDCG stop at the largest k
+    # and the ideal ranking needs just the top max_k grades of each row: a
+    # partition moves them to the end, and only those are sorted.
+    max_k = max(k_list)
+    gains = GAIN_LUT[R[:, :max_k].view(np.uint8)]
+    top = np.partition(R, width - max_k, axis=1)[:, width - max_k:]
+    ideal_gains = GAIN_LUT[np.sort(top, axis=1)[:, ::-1].view(np.uint8)]
+    dcg_cum = np.cumsum(gains * discounts[:max_k], axis=1)
+    idcg_cum = np.cumsum(ideal_gains * discounts[:max_k], axis=1)
+
+    hit = R >= pos_min
+    hits_cum = np.cumsum(hit, axis=1)
+
+    cut = np.asarray(k_list) - 1
+    hits_at_k = hits_cum[:, cut]
+    idcg_at_k = idcg_cum[:, cut]
+    precision = hits_at_k / np.asarray(k_list, dtype=np.float64)
+    recall = hits_at_k / total_rel[:, None]
+    ndcg = np.divide(dcg_cum[:, cut], idcg_at_k,
+                     out=np.zeros(idcg_at_k.shape), where=idcg_at_k != 0)
+
+    num_rel = hits_cum[:, -1]
+    has_hit = num_rel > 0
+    mrr = np.where(has_hit, 1.0 / (np.argmax(hit, axis=1) + 1), 0.0)
+    ap_sum = np.where(hit, hits_cum / positions, 0.0).sum(axis=1)
+    ap = np.divide(ap_sum, num_rel, out=np.zeros_like(ap_sum), where=has_hit)
+
+    scores = np.column_stack([precision, recall, ndcg, mrr, ap])
+    return qids, scores
+
+
+def aggregate_with_ci(scores: np.ndarray,
                       metrics_keys: List[str],
                       bootstrap: int = 1000) -> Tuple[Dict[str, float], Dict[str, Tuple[float, float]]]:
     """
+    scores: (queries x metrics) matrix, columns in metrics_keys order
+
     Returns: (means, cis) where
       means[k] = mean score
       cis[k]   = (low95, high95)
     """
-    if not per_query_rows:
+    if len(scores) == 0:
         return {}, {}
 
-    # Build matrix: rows = queries, cols = metrics
-    mat = {k: np.array([row[k] for row in per_query_rows]) for k in metrics_keys}
-
-    means = {k: float(np.mean(mat[k])) for k in metrics_keys}
+    M = np.asarray(scores, dtype=np.float64)
+    col_means = M.mean(axis=0)
+    means = {k: float(m) for k, m in zip(metrics_keys, col_means)}
 
     if bootstrap and bootstrap > 0:
-        # non-parametric bootstrap over queries
-        n = len(per_query_rows)
+        # non-parametric bootstrap over queries: each resample is a row of
+        # multinomial counts over the n queries, so all resample means for
+        # all metrics come out of a single (bootstrap x n) @ (n x metrics) matmul
+        n = len(M)
         rng = np.random.default_rng(12345)
-        lows, highs = {}, {}
-        for k in metrics_keys:
-            samples = []
-            for _ in range(bootstrap):
-                idx = rng.integers(0, n, size=n)
-                samples.append(np.mean(mat[k][idx]))
-            low = float(np.percentile(samples, 2.5))
-            high = float(np.percentile(samples, 97.5))
-            lows[k], highs[k] = low, high
-        cis = {k: (lows[k], highs[k]) for k in metrics_keys}
+        if bootstrap * n <= BOOTSTRAP_MAX_WEIGHT_CELLS:
+            W = rng.multinomial(n, np.full(n, 1.0 / n), size=bootstrap).astype(np.float64)
+            boot_means = (W @ M) / n
+        else:
+            # The weight matrix would be too large: resample query indices in
+            # batches instead, keeping peak memory at about batch * n * metrics
+            boot_means = np.empty((bootstrap, M.shape[1]))
+            batch = max(1, min(bootstrap, BOOTSTRAP_GATHER_CELLS // (n * M.shape[1])))
+            for start in range(0, bootstrap, batch):
+                b = min(batch, bootstrap - start)
+                idx = rng.integers(0, n, size=(b, n))
+                boot_means[start:start + b] = M[idx].mean(axis=1)
+        lows, highs = np.percentile(boot_means, [2.5, 97.5], axis=0)
+        cis = {k: (float(lo), float(hi)) for k, lo, hi in zip(metrics_keys, lows, highs)}
         return means, cis
     else:
         # normal approx (t ~ 1.96)
         cis = {}
-        for k in metrics_keys:
-            arr = mat[k]
+        for j, k in enumerate(metrics_keys):
+            arr = M[:, j]
             std = float(np.std(arr, ddof=1)) if len(arr) > 1 else 0.0
             ci = 1.96 * std / math.sqrt(max(1, len(arr)))
             cis[k] = (means[k] - ci, means[k] + ci)
@@ -251,68 +397,62 @@ def main():
     runs_by_mq = load_runs(db, args.model_include, args.model_exclude)
 
     k_list = sorted(set(args.k))
-    metrics_keys = [f"P@{k}" for k in k_list] + \
-                   [f"Recall@{k}" for k in k_list] + \
-                   [f"NDCG@{k}" for k in k_list] + ["MRR", "MAP"]
-
-    # Per-query table (for export)
-    per_query_rows_all_models = []    # dicts: {model, question_id, metrics...}
+    # Relevant-node counts depend only on qrels, so they are shared by all models
+    total_rel_by_q = {
+        qid: sum(1 for v in rels.values() if v >= args.positive_min)
+        for qid, rels in qrels_by_q.items()
+    }
+    metrics_keys = metric_names(k_list)
+
+    # Per-query table (for export), streamed to disk one model block at a time
+    perq_path = os.path.join(args.outdir, "per_query_metrics.csv")
+    perq_fields = ["model", "question_id"] + metrics_keys
 
-    # Wide NDCG@10 table (for significance)
+    # Wide NDCG@10 table (for significance): model -> NDCG@10 indexed by question_id
     want_ndcg_k = 10
-    ndcg10_by_q_model: Dict[str, Dict[str, float]] = defaultdict(dict)
+    ndcg10_by_model: Dict[str, pd.Series] = {}
 
-    summary_rows = []  # model-level summary
+    ndcg_col = metrics_keys.index(f"NDCG@{want_ndcg_k}") if want_ndcg_k in k_list else None
 
-    for model, q2ranked in runs_by_mq.items():
-        per_query_rows = []
-        eval_count = 0
-        for qid, ranked_pairs in q2ranked.items():
-            # Skip queries that lack qrels entirely
-            if qid not in qrels_by_q:
-                continue
+    summary_rows = []  # model-level summary
 
-            # rank order over unique node_ids
-            ranked_node_ids = [nid for _, nid in sorted(ranked_pairs, key=lambda x: x[0])]
+    with open(perq_path, "w", newline="") as perq_f:
+        pd.DataFrame(columns=perq_fields).to_csv(perq_f, index=False)
 
-            perq = evaluate_per_query(
-                ranked_node_ids=ranked_node_ids,
-                qrels_lookup=qrels_by_q[qid],
-                k_list=k_list,
-                pos_min=args.positive_min,
-            )
+        for model in list(runs_by_mq):
+            # Drop each model's rankings as soon as they are evaluated
+            q2ranked = runs_by_mq.pop(model)
+            qids, scores = evaluate_queries(q2ranked, qrels_by_q, total_rel_by_q, k_list, args.positive_min)
+            del q2ranked
+            eval_count = len(qids)
 
-            if perq.get("_skip", 0) == 1:
-                continue  # no relevant in qrels
+            if eval_count == 0:
+                print(f"[WARN] Model '{model}' has 0 evaluable queries (no labels or zero-relevant). Skipping summary.")
+                continue
 
-            eval_count += 1
-            # Fill per-query export row
-            outrow = {"model": model, "question_id": qid}
-            for key in metrics_keys:
-                outrow[key] = perq[key]
-            per_query_rows.append({k: outrow[k] for k in outrow})
-            per_query_rows_all_models.append({k: outrow[k] for k in outrow})
+            qid_col = np.asarray(qids, dtype=object)
+            perq = pd.DataFrame(scores, columns=metrics_keys)
+            perq.insert(0, "question_id", qid_col)
+            perq.insert(0, "model", model)
+            perq.to_csv(perq_f, header=False, index=False)
 
             # NDCG@10 capture
-            if f"NDCG@{want_ndcg_k}" in perq:
-                ndcg10_by_q_model[qid][model] = perq[f"NDCG@{want_ndcg_k}"]
+            if ndcg_col is not None:
+                ndcg10_by_model[model] = pd.Series(scores[:, ndcg_col], index=qid_col)
 
-        if eval_count == 0:
-            print(f"[WARN] Model '{model}' has 0 evaluable queries (no labels or zero-relevant). Skipping summary.")
-            continue
-
-        means, cis = aggregate_with_ci(per_query_rows, metrics_keys, bootstrap=args.bootstrap)
+            means, cis = aggregate_with_ci(scores, metrics_keys, bootstrap=args.bootstrap)
 
-        # Summarize
-        summary = {"model": model, "n_queries": eval_count}
-        for key in metrics_keys:
-            low, high = cis[key]
-            summary[f"{key}_mean"] = means[key]
-            summary[f"{key}_ci_low"] = low
-            summary[f"{key}_ci_high"] = high
-        summary_rows.append(summary)
+            # Summarize
+            summary = {"model": model, "n_queries": eval_count}
+            for key in metrics_keys:
+                low, high = cis[key]
+                summary[f"{key}_mean"] = means[key]
+                summary[f"{key}_ci_low"] = low
+                summary[f"{key}_ci_high"] = high
+            summary_rows.append(summary)
 
     if not summary_rows:
+        os.remove(perq_path)
         print("[ERROR] No models had evaluable queries. Check qrels version and runs data.")
         return
 
@@ -322,33 +462,17 @@ def main():
     fieldnames = ["model", "n_queries"] + [
         f"{m}_{suf}" for m in metrics_keys for suf in ("mean", "ci_low", "ci_high")
     ]
-    with open(summary_path, "w", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=fieldnames)
-        w.writeheader()
-        for row in summary_rows:
-            w.writerow(row)
+    pd.DataFrame(summary_rows, columns=fieldnames).to_csv(summary_path, index=False)
     print(f"[OK] Wrote {summary_path}")
 
-    # 2) Per-query metrics (long)
-    perq_path = os.path.join(args.outdir, "per_query_metrics.csv")
-    perq_fields = ["model", "question_id"] + metrics_keys
-    with open(perq_path, "w", newline="") as f:
-        w = csv.DictWriter(f, fieldnames=perq_fields)
-        w.writeheader()
-        for row in per_query_rows_all_models:
-            w.writerow(row)
+    # 2) Per-query metrics (long), already written model by model above
     print(f"[OK] Wrote {perq_path}")
 
     # 3) Wide per-query NDCG@10 (handy for Wilcoxon outside this script)
     ndcg10_path = os.path.join(args.outdir, "per_query_ndcg10.csv")
-    # Make a stable list of models present
-    all_models = sorted({m for _, md in ndcg10_by_q_model.items() for m in md.keys()})
-    with open(ndcg10_path, "w", newline="") as f:
-        w = csv.writer(f)
-        w.writerow(["question_id"] + all_models)
-        for qid in sorted(ndcg10_by_q_model.keys()):
-            row = [qid] + [ndcg10_by_q_model[qid].get(m, "") for m in all_models]
-            w.writerow(row)
+    # Rows sorted by question, columns by model; missing (question, model) cells stay empty
+    ndcg10 = pd.DataFrame(ndcg10_by_model)
+    ndcg10.sort_index(axis=0).sort_index(axis=1).to_csv(ndcg10_path, index_label="question_id")
     print(f"[OK] Wrote {ndcg10_path}")
 
     print("[DONE] Metrics computed.")
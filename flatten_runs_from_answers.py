@@ -1,12 +1,15 @@
 #!/usr/bin/env python3
 import os
-from typing import Any
+import sys
+from typing import Any, Tuple
 
 from pymongo import MongoClient
+from pymongo.errors import BulkWriteError
 
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
 DB = os.getenv("DB", "oncopro")
 DROP_DUPLICATES = os.getenv("DROP_DUPLICATES", "1") != "0"  # default: drop
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "10000"))
 
 client = MongoClient(MONGO_URI)
 db = client[DB]
@@ -14,86 +17,97 @@ answers = db["answers"]
 runs = db["runs"]
 
 runs.drop()
-# keep a simple index; use unique key on (question_id, model_name, node_id) to avoid dup rows
-runs.create_index([("question_id", 1), ("model_name", 1), ("node_id", 1)], unique=True)
 
-def get_node_id(x: Any) -> str | None:
-    if x is None:
-        return None
-    if isinstance(x, str):
-        return x
-    if isinstance(x, dict):
-        if "node" in x:
-            n = x.get("node")
-            if isinstance(n, str):
-                return n
-            if isinstance(n, dict):
-                if "id" in n:  return str(n["id"])
-                if "_id" in n: return str(n["_id"])
-        if "id" in x:  return str(x["id"])
-        if "_id" in x: return str(x["_id"])
-        if "node_id" in x: return str(x["node_id"])
-    return None
-
-def get_original_index(x: Any) -> int | None:
-    """Extract original_index from OrderedNodeRecord. Returns -1 for manually added nodes."""
-    if not isinstance(x, dict):
-        return None
-    # For OrderedNodeRecord format: { node: ..., original_index: int }
-    if "original_index" in x:
-        try:
-            return int(x["original_index"])
-        except (ValueError, TypeError):
-            return None
-    return None
+def parse_elem(x: Any) -> Tuple[str | None, float | None, int | None, bool, bool, bool]:
+    """Extract everything the loop needs from one ordered_nodes/nodes element.
 
-def is_manually_added(x: Any) -> bool:
-    """Check if this is a manually added node (original_index = -1 or isManuallyAdded flag)."""
+    Walks the element and its nested ``node`` once instead of through separate
+    node-id, original-index, score and flag helpers.
+    Returns (node_id, score, original_index, is_duplicate, is_irrelevant, is_manually_added).
+    """
     if not isinstance(x, dict):
-        return False
-    
-    # Check original_index = -1 in OrderedNodeRecord
-    original_idx = get_original_index(x)
-    if original_idx == -1:
-        return True
-    
-    # Check isManuallyAdded flag (either at top level or in nested node)
-    if x.get("isManuallyAdded") is True:
-        return True
-    
-    n = x.get("node")
-    if isinstance(n, dict) and n.get("isManuallyAdded") is True:
-        return True
-    
-    return False
+        return (x if isinstance(x, str) else None), None, None, False, False, False
 
-def is_marked_duplicate(x: Any) -> bool:
-    if not isinstance(x, dict):
-        return False
-    if x.get("isDuplicate") is True:
-        return True
     n = x.get("node")
-    if isinstance(n, dict) and n.get("isDuplicate") is True:
-        return True
-    return False
+    nd = n if isinstance(n, dict) else None
+
+    if isinstance(n, str):
+        nid = n
+    elif nd is not None and "id" in nd:
+        nid = str(nd["id"])
+    elif nd is not None and "_id" in nd:
+        nid = str(nd["_id"])
+    elif "id" in x:
+        nid = str(x["id"])
+    elif "_id" in x:
+        nid = str(x["_id"])
+    elif "node_id" in x:
+        nid = str(x["node_id"])
+    else:
+        nid = None
+
+    # OrderedNodeRecord format: { node: ..., original_index: int }, -1 = manually added
+    original_index = None
+    if "original_index" in x:
+        try:
+            original_index = int(x["original_index"])
+        except (ValueError, TypeError):
+            original_index = None
+
+    # score may be at top level (SavedNode) or nested under `node`
+    score = None
+    try:
+        if "score" in x:
+            score = float(x["score"])
+        elif nd is not None and "score" in nd:
+            score = float(nd["score"])
+    except Exception:
+        score = None
 
-def is_marked_irrelevant(x: Any) -> bool:
-    if not isinstance(x, dict):
-        return False
-    if x.get("isIrrelevant") is True:
-        return True
-    n = x.get("node")
-    if isinstance(n, dict) and n.get("isIrrelevant") is True:
-        return True
-    return False
+    is_dup = x.get("isDuplicate") is True or (nd is not None and nd.get("isDuplicate") is True)
+    is_irrelevant = x.get("isIrrelevant") is True or (nd is not None and nd.get("isIrrelevant") is True)
+    is_manual = (
+        original_index == -1
+        or x.get("isManuallyAdded") is True
+        or (nd is not None and nd.get("isManuallyAdded") is True)
+    )
+    return nid, score, original_index, is_dup, is_irrelevant, is_manual
 
-inserted = answers_seen = 0
+inserted = answers_seen = skipped_existing = 0
 skipped_dup_flag = skipped_repeat_id = manually_added_cnt = 0
 
-for a in answers.find({}):
+# runs was dropped above, so this set enforces the (question_id, model_name, node_id)
+# uniqueness in Python; rows are only staged (and ranked) if they are new
+written_keys = set()
+docs_buf = []
+
+def flush_docs() -> None:
+    """Insert the staged rows with one unordered insert_many."""
+    global inserted, skipped_existing
+    if not docs_buf:
+        return
+    try:
+        res = runs.insert_many(docs_buf, ordered=False)
+        inserted += len(res.inserted_ids)
+    except BulkWriteError as e:
+        inserted += e.details.get("nInserted", 0)
+        skipped_existing += sum(1 for err in e.details.get("writeErrors", []) if err.get("code") == 11000)
+    docs_buf.clear()
+
+# Only the id fields and node lists are read below; skip the rest of the payload.
+# ordered_nodes can be large, so keep cursor batches small.
+cursor = answers.find(
+    {},
+    {"_id": 1, "question_id": 1, "question": 1, "id": 1, "model_name": 1, "ordered_nodes": 1, "nodes": 1},
+    batch_size=200,
+)
+
+for a in cursor:
     answers_seen += 1
-    qid = str(a.get("question_id") or a.get("question") or a.get("id") or a.get("_id"))
-    model = a.get("model_name") or "unknown"
+    # Ids repeat across answers and are held in written_keys for the whole
+    # run, so intern them to keep one copy of each string
+    qid = sys.intern(str(a.get("question_id") or a.get("question") or a.get("id") or a.get("_id")))
+    model = sys.intern(a.get("model_name") or "unknown")
     
     # Prefer ordered_nodes over nodes for runs (represents annotated order)
     items = a.get("ordered_nodes") or a.get("nodes") or []
@@ -102,11 +116,12 @@ for a in answers.find({}):
     rank = 1
 
     for elem in items:
-        if DROP_DUPLICATES and is_marked_duplicate(elem):
+        nid, score, original_index, is_dup, is_irrelevant, is_manual = parse_elem(elem)
+
+        if DROP_DUPLICATES and is_dup:
             skipped_dup_flag += 1
             continue
 
-        nid = get_node_id(elem)
         if not nid:
             continue
 
@@ -114,45 +129,43 @@ for a in answers.find({}):
             skipped_repeat_id += 1
             continue
 
-        score = None
-        original_index = get_original_index(elem)
-        is_irrelevant = is_marked_irrelevant(elem)
-        is_manual = is_manually_added(elem)
-        
         if is_manual:
             manually_added_cnt += 1
-        
-        if isinstance(elem, dict):
-            # score may be at top level (SavedNode) or nested under `node`
-            try:
-                if "score" in elem:
-                    score = float(elem.get("score"))
-                elif "node" in elem and isinstance(elem["node"], dict) and "score" in elem["node"]:
-                    score = float(elem["node"].get("score"))
-            except Exception:
-                score = None
 
-        try:
-            runs.insert_one({
-                "question_id": qid,
-                "model_name": model,
-                "node_id": nid,
-                "rank": rank,              # rank over kept (unique) nodes
-                "score": score,
-                "original_index": original_index,
-                "is_irrelevant": is_irrelevant,
-                "is_manually_added": is_manual,
-            })
-            inserted += 1
-            rank += 1
-            seen_ids.add(nid)
-        except Exception as e:
-            # unique index will skip exact duplicates; log and continue
-            # print(f"skip insert for ({qid},{model},{nid}): {e}")
+        # exact duplicates are skipped and don't consume a rank
+        nid = sys.intern(nid)
+        key = (qid, model, nid)
+        if key in written_keys:
             continue
+        written_keys.add(key)
+
+        docs_buf.append({
+            "question_id": qid,
+            "model_name": model,
+            "node_id": nid,
+            "rank": rank,              # rank over kept (unique) nodes
+            "score": score,
+            "original_index": original_index,
+            "is_irrelevant": is_irrelevant,
+            "is_manually_added": is_manual,
+        })
+        rank += 1
+        seen_ids.add(nid)
+        if len(docs_buf) >= BULK_BATCH_SIZE:
+            flush_docs()
+
+flush_docs()
+
+# Build the unique index once over the loaded collection rather than updating
+# it on every insert; it stays as a backstop against duplicate rows.
+runs.create_index([("question_id", 1), ("model_name", 1), ("node_id", 1)], unique=True)
+# Serves compute_metrics.load_runs: its model filter and its
+# (model, question, rank, _id) sort
+runs.create_index([("model_name", 1), ("question_id", 1), ("rank", 1), ("_id", 1)])
 
 print(
     f"runs built: {inserted} rows from {answers_seen} answers | "
+    f"skipped_existing={skipped_existing}, "
     f"skipped_dup_flag={skipped_dup_flag}, skipped_repeat_id={skipped_repeat_id}, "
     f"manually_added={manually_added_cnt}, "
     f"DROP_DUPLICATES={'on' if DROP_DUPLICATES else 'off'}"
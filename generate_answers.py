@@ -27,6 +27,9 @@ Examples:
     # Generate answers with top 10 results per question
     python generate_answers.py --top-k 10
 
+    # Overlap searches on 4 threads (model calls still run one at a time)
+    python generate_answers.py --workers 4
+
     # Show statistics after generation
     python generate_answers.py --stats
 
@@ -43,7 +46,10 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 import argparse
 import logging
-from typing import Optional, List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Tuple
+
+from pymongo.errors import BulkWriteError
 
 from src import (
     MongoDBClient, 
@@ -54,6 +60,11 @@ from src import (
     setup_logging
 )
 
+# Number of questions embedded and searched together per worker task
+SEARCH_BATCH_SIZE = 64
+# Number of generated answers written per insert_many
+ANSWER_BATCH_SIZE = 500
+
 
 def show_stats(questions_manager: QuestionsManager, answers_manager: AnswersManager) -> None:
     """Show statistics for questions and answers."""
@@ -118,22 +129,74 @@ def clear_model_answers(answers_manager: AnswersManager, model_name: str, confir
     print(f"✅ Cleared {count_deleted} answers for model {model_name}.")
 
 
+def format_answer_nodes(search_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Shape search hits into answer node documents."""
+    nodes_data = []
+    for result in search_results or []:
+        node_data = {
+            "id": result["nodeid"],
+            "text": result.get("text", ""),
+            "richText": result.get("richText", ""),
+            "notes": result.get("notes", ""),
+            "links": result.get("links", []),
+            "attributes": result.get("attributes", {}),
+            "score": result["score"],
+            "graph_context": result.get("graph_context")
+        }
+        nodes_data.append(node_data)
+    return nodes_data
+
+
+def search_question_batch(
+    search_manager: SearchManager,
+    questions_de: List[str],
+    top_k: int,
+    threshold: float
+) -> List[Any]:
+    """
+    Search a batch of questions with one batched embedding call.
+    
+    Returns, per question, its answer nodes or the exception its search raised.
+    If the batched call fails, the questions are retried one by one so a single
+    bad question does not fail the whole batch.
+    """
+    try:
+        batch_results = search_manager.cosine_search_batch(questions_de, top_k=top_k, threshold=threshold)
+        return [format_answer_nodes(results) for results in batch_results]
+    except Exception:
+        outcomes: List[Any] = []
+        for question_de in questions_de:
+            try:
+                search_results = search_manager.cosine_search(question_de, top_k=top_k, threshold=threshold)
+                outcomes.append(format_answer_nodes(search_results))
+            except Exception as e:
+                outcomes.append(e)
+        return outcomes
+
+
 def generate_answers_for_questions(
     questions_manager: QuestionsManager,
     answers_manager: AnswersManager,
     search_manager: SearchManager,
     top_k: int = 10,
-    threshold: float = 0.0
+    threshold: float = 0.0,
+    max_workers: int = 1
 ) -> Dict[str, int]:
     """
     Generate answers for all questions by searching using the question_de text.
     
+    Questions are searched in batches of SEARCH_BATCH_SIZE on a thread pool.
+    Embedding calls on the shared model are serialized, so extra workers only
+    overlap the similarity ranking and Mongo reads. Existing answers are looked up once up front, and new answers
+    are inserted in batches on the calling thread.
+    
     Args:
         questions_manager: Manager for questions collection
         answers_manager: Manager for answers collection
         search_manager: Manager for search operations
         top_k: Number of top results to return per question
         threshold: Minimum similarity score threshold
+        max_workers: Number of search threads (default: 1)
         
     Returns:
         Dictionary with generation statistics
@@ -146,7 +209,14 @@ def generate_answers_for_questions(
         return {"processed": 0, "generated": 0, "skipped": 0, "errors": 0}
     
     logging.info(f"Found {len(questions)} questions to process")
-    logging.info(f"Using model: {EMBEDDING_MODEL}, top_k: {top_k}, threshold: {threshold}")
+    logging.info(f"Using model: {EMBEDDING_MODEL}, top_k: {top_k}, threshold: {threshold}, workers: {max_workers}")
+    
+    # Load the embedding model and build the index once here rather than on
+    # the first search of every worker
+    search_manager.warm_up()
+    
+    # One round trip for the idempotency check instead of one per question
+    answered = answers_manager.get_answered_question_ids(EMBEDDING_MODEL)
     
     # Statistics
     processed = 0
@@ -154,61 +224,83 @@ def generate_answers_for_questions(
     skipped = 0
     errors = 0
     
-    for question in questions:
-        question_id = question['_id']  # Keep as ObjectId
-        question_de = question.get('question_de', '').strip()
-        question_en = question.get('question_en', '').strip()
-        
-        processed += 1
-        
-        # Skip if question_de is empty
-        if not question_de:
-            logging.warning(f"Question {question_id} has empty question_de, skipping")
-            skipped += 1
-            continue
-        
-        # Check if answer already exists for this question and model (idempotent)
-        if answers_manager.answer_exists(question_id, EMBEDDING_MODEL):
-            logging.debug(f"Answer already exists for question {question_id} with model {EMBEDDING_MODEL}, skipping")
-            skipped += 1
-            continue
-        
+    # Finished answers are inserted in batches of ANSWER_BATCH_SIZE
+    pending: List[Tuple[Any, List[Dict[str, Any]]]] = []
+    
+    def flush_pending() -> None:
+        nonlocal generated, errors
+        if not pending:
+            return
         try:
-            logging.info(f"Processing question {processed}/{len(questions)}: {question_de[:100]}...")
-            
+            answers_manager.insert_answers_batch(pending, EMBEDDING_MODEL)
+            generated += len(pending)
+        except BulkWriteError as e:
+            inserted = e.details.get("nInserted", 0)
+            logging.error(f"Failed to insert {len(pending) - inserted} of {len(pending)} answers: {e}")
+            generated += inserted
+            errors += len(pending) - inserted
+        except Exception as e:
+            logging.error(f"Error inserting {len(pending)} answers: {e}")
+            errors += len(pending)
+        pending.clear()
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        batch_ids: List[Any] = []
+        batch_texts: List[str] = []
+        
+        def submit_batch() -> None:
             # Search using the German question text
-            search_results = search_manager.cosine_search(question_de, top_k=top_k, threshold=threshold)
+            future = executor.submit(search_question_batch, search_manager, list(batch_texts), top_k, threshold)
+            futures[future] = list(batch_ids)
+            batch_ids.clear()
+            batch_texts.clear()
+        
+        for question in questions:
+            question_id = question['_id']  # Keep as ObjectId
+            question_de = question.get('question_de', '').strip()
             
-            if not search_results:
-                logging.warning(f"No search results found for question {question_id}")
-                # Still create an entry with empty nodes
-                search_results = []
+            processed += 1
             
-            # Prepare nodes data for storage
-            nodes_data = []
-            for result in search_results:
-                node_data = {
-                    "id": result["nodeid"],
-                    "text": result.get("text", ""),
-                    "richText": result.get("richText", ""),
-                    "notes": result.get("notes", ""),
-                    "links": result.get("links", []),
-                    "attributes": result.get("attributes", {}),
-                    "score": result["score"],
-                    "graph_context": result.get("graph_context")
-                }
-                nodes_data.append(node_data)
+            # Skip if question_de is empty
+            if not question_de:
+                logging.warning(f"Question {question_id} has empty question_de, skipping")
+                skipped += 1
+                continue
             
-            # Insert answer into the collection
-            answer_id = answers_manager.insert_answer(question_id, EMBEDDING_MODEL, nodes_data)
+            # Check if answer already exists for this question and model (idempotent)
+            if question_id in answered:
+                logging.debug(f"Answer already exists for question {question_id} with model {EMBEDDING_MODEL}, skipping")
+                skipped += 1
+                continue
             
-            generated += 1
-            logging.info(f"Generated answer {answer_id} for question {question_id} with {len(nodes_data)} nodes")
+            logging.info(f"Processing question {processed}/{len(questions)}: {question_de[:100]}...")
             
-        except Exception as e:
-            logging.error(f"Error processing question {question_id}: {e}")
-            errors += 1
-            continue
+            batch_ids.append(question_id)
+            batch_texts.append(question_de)
+            if len(batch_ids) >= SEARCH_BATCH_SIZE:
+                submit_batch()
+        
+        if batch_ids:
+            submit_batch()
+        
+        for future in as_completed(futures):
+            for question_id, nodes_data in zip(futures[future], future.result()):
+                if isinstance(nodes_data, Exception):
+                    logging.error(f"Error processing question {question_id}: {nodes_data}")
+                    errors += 1
+                    continue
+                
+                if not nodes_data:
+                    # Still create an entry with empty nodes
+                    logging.warning(f"No search results found for question {question_id}")
+                
+                pending.append((question_id, nodes_data))
+                logging.info(f"Generated answer for question {question_id} with {len(nodes_data)} nodes")
+                if len(pending) >= ANSWER_BATCH_SIZE:
+                    flush_pending()
+    
+    flush_pending()
     
     # Final statistics
     stats = {
@@ -229,6 +321,8 @@ def main():
                         help="Number of top search results to store per question (default: 5)")
     parser.add_argument("--threshold", type=float, default=0.0,
                         help="Minimum similarity score threshold (default: 0.0)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of concurrent search threads (default: 1)")
     parser.add_argument("--clear-model", action="store_true", 
                         help="Clear existing answers for current model before generating new ones")
     parser.add_argument("--stats", action="store_true", 
@@ -252,8 +346,10 @@ def main():
     logging.info(f"Similarity threshold: {args.threshold}")
     
     try:
-        # Initialize database components - all using "oncopro" database
-        with MongoDBClient(database_name="nomicv2") as questions_db_client:
+        # One connection serves both databases: embeddings in the default
+        # database, questions and answers in "nomicv2"
+        with MongoDBClient() as embedding_db_client:
+            questions_db_client = embedding_db_client.with_database("nomicv2")
             questions_manager = QuestionsManager(questions_db_client)
             answers_manager = AnswersManager(questions_db_client)
             
@@ -264,9 +360,8 @@ def main():
             # Show initial stats
             if args.stats:
                 show_stats(questions_manager, answers_manager)
-        
-        # Initialize search manager with the embedding model database
-        with MongoDBClient() as embedding_db_client:
+            
+            # Initialize search manager with the embedding model database
             search_manager = SearchManager(embedding_db_client)
             
             # Check if we have embeddings
@@ -278,33 +373,30 @@ def main():
             logging.info(f"Found {search_stats['total_nodes_with_embeddings']} nodes with embeddings for search")
             
             # Generate answers
-            with MongoDBClient(database_name="nomicv2") as questions_db_client:
-                questions_manager = QuestionsManager(questions_db_client)
-                answers_manager = AnswersManager(questions_db_client)
-                
-                generation_stats = generate_answers_for_questions(
-                    questions_manager, 
-                    answers_manager, 
-                    search_manager,
-                    top_k=args.top_k,
-                    threshold=args.threshold
-                )
-                
-                # Show results
-                if generation_stats["generated"] > 0:
-                    logging.info(f"✅ Successfully generated {generation_stats['generated']} new answers")
-                if generation_stats["skipped"] > 0:
-                    logging.info(f"⏭️  Skipped {generation_stats['skipped']} questions (already have answers or empty)")
-                if generation_stats["errors"] > 0:
-                    logging.warning(f"❌ Encountered {generation_stats['errors']} errors")
-                
-                # Show final statistics
-                if args.stats:
-                    show_stats(questions_manager, answers_manager)
-                
-                # Show sample answers if requested
-                if args.sample:
-                    show_sample_answers(answers_manager, args.sample)
+            generation_stats = generate_answers_for_questions(
+                questions_manager, 
+                answers_manager, 
+                search_manager,
+                top_k=args.top_k,
+                threshold=args.threshold,
+                max_workers=args.workers
+            )
+            
+            # Show results
+            if generation_stats["generated"] > 0:
+                logging.info(f"✅ Successfully generated {generation_stats['generated']} new answers")
+            if generation_stats["skipped"] > 0:
+                logging.info(f"⏭️  Skipped {generation_stats['skipped']} questions (already have answers or empty)")
+            if generation_stats["errors"] > 0:
+                logging.warning(f"❌ Encountered {generation_stats['errors']} errors")
+            
+            # Show final statistics
+            if args.stats:
+                show_stats(questions_manager, answers_manager)
+            
+            # Show sample answers if requested
+            if args.sample:
+                show_sample_answers(answers_manager, args.sample)
         
         logging.info("Answer generation completed successfully")
         
@@ -11,8 +11,10 @@ Outputs:
   case_studies/failure.md
 """
 import os, re, math
+from collections import defaultdict
 from typing import Dict, List, Tuple
 from pymongo import MongoClient
+import numpy as np
 import pandas as pd
 
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
@@ -27,36 +29,44 @@ models = [c for c in wide.columns if c != "question_id"]
 
 def pick_cases(df: pd.DataFrame) -> Tuple[Tuple[str,str], Tuple[str,str]]:
     # returns ((success_qid, success_model), (failure_qid, failure_model))
-    # success
-    best_row = None; best_spread = -1.0; best_model = None
-    for _, r in df.iterrows():
-        vals = [(m, r[m]) for m in models if not pd.isna(r[m])]
-        if not vals: continue
-        v = [x[1] for x in vals]
-        mx, mn = max(v), min(v)
-        if mx >= 0.9 and (mx - mn) >= 0.3:
-            m_star = max(vals, key=lambda x:x[1])[0]
-            return ((r["question_id"], m_star), None)
-        if mx > best_spread:
-            best_spread = mx
-            best_row = r
-            best_model = max(vals, key=lambda x:x[1])[0]
-    succ = (best_row["question_id"], best_model) if best_row is not None else (None, None)
-
-    # failure
-    worst_row = None; worst_max = 10.0; worst_model = None
-    for _, r in df.iterrows():
-        vals = [(m, r[m]) for m in models if not pd.isna(r[m])]
-        if not vals: continue
-        mx = max(x[1] for x in vals)
-        if mx <= 0.2:
-            m_star = max(vals, key=lambda x:x[1])[0]
-            return (succ, (r["question_id"], m_star))
-        if mx < worst_max:
-            worst_max = mx
-            worst_row = r
-            worst_model = max(vals, key=lambda x:x[1])[0]
-    fail = (worst_row["question_id"], worst_model) if worst_row is not None else (None, None)
+    # per-row max/min/argmax over the model columns, ignoring NaN cells;
+    # rows without any score are never picked
+    if not models:
+        return ((None, None), (None, None))
+    vals = df[models].to_numpy(dtype=np.float64)
+    observed = ~np.isnan(vals)
+    has_vals = observed.any(axis=1)
+    filled = np.where(observed, vals, -np.inf)
+    mx = filled.max(axis=1)
+    mn = np.where(observed, vals, np.inf).min(axis=1)
+    best_model = np.asarray(models, dtype=object)[filled.argmax(axis=1)]
+    qids = df["question_id"].to_numpy()
+
+    # success: first row with a strong and spread-out best model, else the
+    # first row with the highest max
+    hits = np.flatnonzero(has_vals & (mx >= 0.9) & ((mx - mn) >= 0.3))
+    if len(hits):
+        i = hits[0]
+        return ((qids[i], best_model[i]), None)
+    cand = np.flatnonzero(has_vals & (mx > -1.0))
+    if len(cand):
+        i = cand[mx[cand].argmax()]
+        succ = (qids[i], best_model[i])
+    else:
+        succ = (None, None)
+
+    # failure: first row where even the best model is weak, else the first
+    # row with the lowest max
+    hits = np.flatnonzero(has_vals & (mx <= 0.2))
+    if len(hits):
+        i = hits[0]
+        return (succ, (qids[i], best_model[i]))
+    cand = np.flatnonzero(has_vals & (mx < 10.0))
+    if len(cand):
+        i = cand[mx[cand].argmin()]
+        fail = (qids[i], best_model[i])
+    else:
+        fail = (None, None)
     return (succ, fail)
 
 succ, fail = pick_cases(wide)
@@ -64,30 +74,34 @@ succ, fail = pick_cases(wide)
 client = MongoClient(MONGO_URI)
 db = client[DB]
 
-# Index runs by (model,q)→sorted node_ids
-runs_cur = db["runs"].aggregate([
-    {"$sort": {"model_name": 1, "question_id": 1, "rank": 1}}
-])
-runs_by_mq: Dict[Tuple[str,str], List[str]] = {}
-for r in runs_cur:
-    key = (r["model_name"], str(r["question_id"]))
-    runs_by_mq.setdefault(key, []).append(str(r["node_id"]))
+# Supports the per-(model,q) answer lookup in answer_payloads
+db["answers"].create_index([("model_name", 1), ("question_id", 1)])
 
-# qrels lookup
-qrels_by_q: Dict[str, Dict[str, int]] = {}
-for r in db["qrels"].find({}):
-    qid = str(r["question_id"]); nid = str(r["node_id"])
-    qrels_by_q.setdefault(qid, {})[nid] = int(r.get("relevance", 0))
+# (model,q) pairs that will be rendered
+cases = [c for c in (succ, fail) if c and c[0] and c[1]]
 
-def fetch_question_text(qid: str) -> Tuple[str,str]:
-    qdoc = db["questions"].find_one({"_id": qid}) or db["questions"].find_one({"id": qid})
-    if not qdoc: return ("", "")
-    return (qdoc.get("question_en",""), qdoc.get("question_de",""))
+# Index runs by (model,q)→sorted node_ids; only the rendered pairs are read
+# (runs store question_id as a string)
+runs_by_mq: Dict[Tuple[str,str], List[str]] = {}
+if cases:
+    runs_cur = db["runs"].aggregate([
+        {"$match": {"$or": [{"model_name": m, "question_id": str(q)} for q, m in cases]}},
+        {"$sort": {"model_name": 1, "question_id": 1, "rank": 1}},
+        {"$project": {"_id": 0, "model_name": 1, "question_id": 1, "node_id": 1}},
+    ])
+    for r in runs_cur:
+        key = (r["model_name"], str(r["question_id"]))
+        runs_by_mq.setdefault(key, []).append(str(r["node_id"]))
 
-def node_payload(model: str, qid: str, nid: str):
-    # find the answer doc and pull node content by id from ordered_nodes or nodes
-    ans = db["answers"].find_one({"model_name": model, "question_id": qid})
-    if not ans: return {}
+# qrels lookup, reading only the three fields it needs
+qrels_by_q: Dict[str, Dict[str, int]] = defaultdict(dict)
+for r in db["qrels"].find({}, {"_id": 0, "question_id": 1, "node_id": 1, "relevance": 1}, batch_size=5000):
+    qrels_by_q[str(r["question_id"])][str(r["node_id"])] = int(r.get("relevance", 0))
+
+def answer_payloads(ans: dict) -> Dict[str, dict]:
+    # map node id -> payload for one answer doc,
+    # first occurrence in ordered_nodes then nodes wins
+    payloads: Dict[str, dict] = {}
     lists = (ans.get("ordered_nodes") or []) + (ans.get("nodes") or [])
     for el in lists:
         # flatten variants
@@ -96,20 +110,53 @@ def node_payload(model: str, qid: str, nid: str):
             if "node" in el and isinstance(el["node"], dict):
                 cand = el["node"]
             elif "node" in el and isinstance(el["node"], str):
-                if el["node"] == nid: return {"id": nid}
+                payloads.setdefault(el["node"], {"id": el["node"]})
             elif "id" in el or "_id" in el:
                 cand = el
             if cand:
                 cid = str(cand.get("id") or cand.get("_id") or "")
-                if cid == nid:
-                    return {
+                if cid not in payloads:
+                    payloads[cid] = {
                         "id": cid,
                         "text": cand.get("text","") or cand.get("richText",""),
                         "links": cand.get("links", []),
                         "notes": cand.get("notes",""),
                         "attributes": cand.get("attributes", {}),
                     }
-    return {"id": nid}
+    return payloads
+
+# Prefetch the question texts and answer docs of the rendered cases with one
+# query each; render_case then only reads from memory
+case_qids = list({q for q, _ in cases})
+questions_by_id: Dict[str, dict] = {}
+questions_by_legacy_id: Dict[str, dict] = {}
+payloads_by_mq: Dict[Tuple[str,str], Dict[str, dict]] = {}
+if cases:
+    for qdoc in db["questions"].find(
+        {"$or": [{"_id": {"$in": case_qids}}, {"id": {"$in": case_qids}}]},
+        {"_id": 1, "id": 1, "question_en": 1, "question_de": 1},
+    ):
+        if qdoc["_id"] in case_qids:
+            questions_by_id.setdefault(qdoc["_id"], qdoc)
+        if qdoc.get("id") in case_qids:
+            questions_by_legacy_id.setdefault(qdoc["id"], qdoc)
+    for ans in db["answers"].find(
+        {"$or": [{"model_name": m, "question_id": q} for q, m in cases]},
+        {"model_name": 1, "question_id": 1, "ordered_nodes": 1, "nodes": 1},
+    ):
+        key = (ans["model_name"], ans["question_id"])
+        if key not in payloads_by_mq:
+            payloads_by_mq[key] = answer_payloads(ans)
+
+def fetch_question_text(qid: str) -> Tuple[str,str]:
+    qdoc = questions_by_id.get(qid) or questions_by_legacy_id.get(qid)
+    if not qdoc: return ("", "")
+    return (qdoc.get("question_en",""), qdoc.get("question_de",""))
+
+def node_payload(model: str, qid: str, nid: str):
+    payloads = payloads_by_mq.get((model, qid))
+    if payloads is None: return {}
+    return payloads.get(nid, {"id": nid})
 
 def render_case(path_md: str, qid: str, model: str, title: str):
     en,de = fetch_question_text(qid)
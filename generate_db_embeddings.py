@@ -5,17 +5,113 @@ This script processes all nodes without embeddings and adds them using the confi
 """
 
 import logging
+import os
+import queue
 import sys
+import threading
+from typing import Any, Dict, List, Optional, Tuple
 
 from src import (
     embed_text,
+    embed_texts,
     MongoDBClient,
     NodesManager,
+    EmbeddingCacheManager,
     EMBEDDING_MODEL,
 )
 from src.embedding_utils import setup_logging, ProgressTracker, log_embedding_stats
 from src.validation import run_pre_embedding_checks
 
+# Nodes embedded together in one model call
+EMBED_BATCH_SIZE = 64
+# Embedded batches buffered ahead of the database writer
+WRITE_QUEUE_SIZE = 4
+# Nodes fetched per cursor round trip
+READ_BATCH_SIZE = 256
+
+# Opt-in: set EMBEDDING_CACHE=1 to reuse embeddings of previously seen texts
+# from the embedding_cache collection (and store new ones there)
+USE_EMBEDDING_CACHE = os.getenv("EMBEDDING_CACHE", "0") == "1"
+
+# One work item for the writer: embedded (node_id, embedding) pairs, new cache
+# entries, and how many nodes of the batch were skipped (no text) or failed
+WriteItem = Tuple[List[Tuple[Any, List[float]]], Dict[str, List[float]], int, int]
+
+
+def embed_batch(
+    batch: List[Tuple[Any, str]],
+    cache: Optional[EmbeddingCacheManager] = None
+) -> Tuple[List[Tuple[Any, List[float]]], Dict[str, List[float]], int]:
+    """
+    Embed a batch of (node_id, text) pairs with one model call.
+    
+    Texts already in the cache, and repeats within the batch (up to
+    whitespace), are not embedded again. If the batched call fails, the
+    texts are retried one by one so a single bad node does not fail the
+    whole batch.
+    
+    Returns:
+        (embedded (node_id, embedding) pairs, new cache entries by key,
+         number of nodes that failed)
+    """
+    keys = [EmbeddingCacheManager.make_key(EMBEDDING_MODEL, text) for _, text in batch]
+    # One text per key: repeats and whitespace-only variants are embedded once
+    texts_by_key = dict(zip(keys, (text for _, text in batch)))
+    
+    by_key: Dict[str, List[float]] = {}
+    if cache is not None:
+        try:
+            by_key = cache.get_many(list(texts_by_key))
+        except Exception as exc:
+            logging.warning(f"Embedding cache lookup failed, embedding the whole batch: {exc}")
+    
+    missing = [key for key in texts_by_key if key not in by_key]
+    new_entries: Dict[str, List[float]] = {}
+    if missing:
+        try:
+            new_entries = dict(zip(missing, embed_texts([texts_by_key[key] for key in missing])))
+        except Exception as exc:
+            logging.warning(f"Batch embedding of {len(missing)} texts failed, retrying one by one: {exc}")
+            for key in missing:
+                text = texts_by_key[key]
+                try:
+                    new_entries[key] = embed_text(text)
+                except Exception as exc:
+                    logging.exception(f"Failed to embed text {text[:50]!r}: {exc}")
+        by_key.update(new_entries)
+    
+    embedded = [(node_id, by_key[key]) for (node_id, _), key in zip(batch, keys) if key in by_key]
+    failed = len(batch) - len(embedded)
+    return embedded, new_entries, failed
+
+
+def write_embeddings(
+    nodes_manager: NodesManager,
+    cache: Optional[EmbeddingCacheManager],
+    write_queue: "queue.Queue[Optional[WriteItem]]",
+    progress: ProgressTracker
+) -> None:
+    """Writer thread: bulk-write embedded batches until a None sentinel arrives."""
+    while True:
+        item = write_queue.get()
+        if item is None:
+            return
+        embedded, new_entries, skipped, failed = item
+        
+        if cache is not None:
+            cache.put_many(new_entries)
+        
+        updated = nodes_manager.batch_update_embeddings(
+            [{"node_id": node_id, "embedding": embedding} for node_id, embedding in embedded]
+        )
+        if updated < len(embedded):
+            logging.error(f"Failed to update {len(embedded) - updated} of {len(embedded)} nodes in database")
+        
+        for _ in range(len(embedded) - updated + failed):
+            progress.add_error()
+        for _ in range(len(embedded) + skipped + failed):
+            progress.update()
+
 
 def main() -> None:
     """Main function to generate embeddings for nodes without them."""
@@ -50,34 +146,54 @@ def main() -> None:
         # Process nodes without embeddings
         logging.info(f"Starting to process {total_nodes} nodes without embeddings...")
         
-        nodes_iterator = nodes_manager.find_nodes_without_embeddings()
+        # The main thread reads and embeds batches while a writer thread
+        # bulk-writes the previous ones; the bounded queue keeps the two in step
+        cache = EmbeddingCacheManager(db_client) if USE_EMBEDDING_CACHE else None
+        write_queue: "queue.Queue[Optional[WriteItem]]" = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        writer = threading.Thread(
+            target=write_embeddings,
+            args=(nodes_manager, cache, write_queue, progress),
+            name="embedding-writer",
+            daemon=True,
+        )
+        writer.start()
+        
+        batch: List[Tuple[Any, str]] = []
+        skipped = 0
+        failed = 0
+        
+        def flush_batch() -> None:
+            nonlocal batch, skipped, failed
+            embedded, new_entries, embed_failed = embed_batch(batch, cache) if batch else ([], {}, 0)
+            write_queue.put((embedded, new_entries, skipped, failed + embed_failed))
+            batch = []
+            skipped = 0
+            failed = 0
         
-        for node in nodes_iterator:
-            try:
-                # Generate text content from the node
-                input_text = node.generate_text_content()
+        try:
+            for node in nodes_manager.find_nodes_without_embeddings(batch_size=READ_BATCH_SIZE):
+                try:
+                    # Generate text content from the node
+                    input_text = node.generate_text_content()
+                except Exception as exc:
+                    logging.exception(f"Failed to embed node {node._id}: {exc}")
+                    failed += 1
+                    continue
                 
                 if not input_text.strip():
                     logging.warning(f"Node {node._id} has no text content, skipping")
-                    progress.update()
+                    skipped += 1
                     continue
                 
-                # Generate embedding using the configured model
-                embedding = embed_text(input_text)
-                
-                # Update the node in the database
-                success = nodes_manager.update_node_embedding(node._id, embedding)
-                
-                if not success:
-                    logging.error(f"Failed to update node {node._id} in database")
-                    progress.add_error()
-                
-                progress.update()
-                
-            except Exception as exc:
-                logging.exception(f"Failed to embed node {node._id}: {exc}")
-                progress.add_error()
-                progress.update()
+                batch.append((node._id, input_text))
+                if len(batch) >= EMBED_BATCH_SIZE:
+                    flush_batch()
+            
+            if batch or skipped or failed:
+                flush_batch()
+        finally:
+            write_queue.put(None)
+            writer.join()
         
         # Log final results
         progress.log_final_summary()
@@ -16,7 +16,7 @@ import logging
 import sys
 import pandas as pd
 from pathlib import Path
-from typing import List, Dict
+from typing import Any, List, Dict
 
 from src import (
     MongoDBClient, 
@@ -25,6 +25,61 @@ from src import (
     setup_logging
 )
 
+try:  # Optional: Rust-based XLSX reader, much faster than openpyxl on large sheets
+    import python_calamine  # noqa: F401
+    XLSX_ENGINE = "calamine"
+except ImportError:
+    XLSX_ENGINE = None  # stream the sheet with openpyxl in read-only mode
+
+
+def _open_sheet_read_only(file_path: Path, sheet_name: str):
+    """Open a worksheet with openpyxl in read-only mode; returns (workbook, worksheet)."""
+    import openpyxl
+
+    wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    if sheet_name not in wb.sheetnames:
+        wb.close()
+        raise ValueError(f"Worksheet named '{sheet_name}' not found")
+    return wb, wb[sheet_name]
+
+
+def read_xlsx_header(file_path: Path, sheet_name: str) -> List[Any]:
+    """Return the column names of a sheet without loading its rows."""
+    if XLSX_ENGINE:
+        return list(pd.read_excel(file_path, sheet_name=sheet_name, nrows=0, engine=XLSX_ENGINE).columns)
+    
+    wb, ws = _open_sheet_read_only(file_path, sheet_name)
+    try:
+        first_row = next(ws.iter_rows(max_row=1, values_only=True), ())
+    finally:
+        wb.close()
+    # Name empty header cells the way pandas does
+    return [f"Unnamed: {i}" if v is None else v for i, v in enumerate(first_row)]
+
+
+def read_xlsx_columns(file_path: Path, sheet_name: str, columns: List[Any]) -> pd.DataFrame:
+    """Read only the given columns of a sheet into a DataFrame."""
+    if XLSX_ENGINE:
+        return pd.read_excel(
+            file_path, sheet_name=sheet_name, engine=XLSX_ENGINE, usecols=columns,
+            dtype={col: "string" for col in columns},
+        )
+    
+    # Without calamine, stream rows in read-only mode instead of letting pandas
+    # build openpyxl's full in-memory cell grid
+    header = read_xlsx_header(file_path, sheet_name)
+    indices = [header.index(col) for col in columns]
+    values: List[List[Any]] = [[] for _ in columns]
+    wb, ws = _open_sheet_read_only(file_path, sheet_name)
+    try:
+        for row in ws.iter_rows(min_row=2, values_only=True):
+            for out, i in zip(values, indices):
+                cell = row[i] if i < len(row) else None
+                out.append(None if cell == "" else cell)
+    finally:
+        wb.close()
+    return pd.DataFrame(dict(zip(columns, values)), dtype="string")
+
 
 def load_questions_from_xlsx(file_path: str, sheet_name: str = "Sheet1") -> List[Dict[str, str]]:
     """
@@ -44,14 +99,14 @@ def load_questions_from_xlsx(file_path: str, sheet_name: str = "Sheet1") -> List
     """
     file_path = Path(file_path)
     
-    if not file_path.exists():
-        raise FileNotFoundError(f"XLSX file not found: {file_path}")
-    
     try:
-        # Read the Excel file
-        df = pd.read_excel(file_path, sheet_name=sheet_name)
-        logging.info(f"Loaded Excel file: {file_path}, Sheet: {sheet_name}")
-        logging.info(f"Found {len(df)} rows and {len(df.columns)} columns")
+        # Read only the header row first; the full read below is limited to
+        # the two question columns once they are identified
+        # Let the reader's own open report a missing file instead of stat-ing first
+        try:
+            header = read_xlsx_header(file_path, sheet_name)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"XLSX file not found: {file_path}") from None
         
         # Check if required columns exist
         # Try different possible column name variations
@@ -65,25 +120,36 @@ def load_questions_from_xlsx(file_path: str, sheet_name: str = "Sheet1") -> List
         # Possible column names for German questions  
         de_variations = ['question_de', 'Question (german)', 'question_german', 'german', 'de']
         
+        # Lowercased lookup sets, built once instead of per column
+        en_set = frozenset(v.lower() for v in en_variations)
+        de_set = frozenset(v.lower() for v in de_variations)
+        
         # Find the actual column names
-        for col in df.columns:
+        for col in header:
             col_lower = col.lower().strip()
-            if col in en_variations or col_lower in [v.lower() for v in en_variations]:
+            if col_lower in en_set:
                 column_mapping['question_en'] = col
-            elif col in de_variations or col_lower in [v.lower() for v in de_variations]:
+            elif col_lower in de_set:
                 column_mapping['question_de'] = col
         
         # Check if we found both columns
         missing_mappings = [key for key, value in column_mapping.items() if value is None]
         if missing_mappings:
-            available_columns = list(df.columns)
+            available_columns = header
             raise ValueError(
                 f"Could not find columns for: {missing_mappings}. "
                 f"Available columns: {available_columns}. "
                 f"Expected variations - English: {en_variations}, German: {de_variations}"
             )
         
-        logging.info(f"Using column mapping: {column_mapping}")
+        logging.info("Using column mapping: %s", column_mapping)
+        
+        # Read the Excel file
+        df = read_xlsx_columns(
+            file_path, sheet_name, [column_mapping['question_en'], column_mapping['question_de']]
+        )
+        logging.info("Loaded Excel file: %s, Sheet: %s", file_path, sheet_name)
+        logging.info("Found %s rows and %s columns", len(df), len(header))
         
         # Rename columns to standard names for easier processing
         df = df.rename(columns={
@@ -91,32 +157,25 @@ def load_questions_from_xlsx(file_path: str, sheet_name: str = "Sheet1") -> List
             column_mapping['question_de']: 'question_de'
         })
         
-        # Remove rows where both questions are empty/NaN
-        df_clean = df.dropna(subset=['question_en', 'question_de'], how='all')
+        # Stringify and strip each column, with missing cells as ""
+        sub = pd.DataFrame({
+            col: df[col].astype(str).str.strip().where(df[col].notna(), "")
+            for col in ('question_en', 'question_de')
+        })
         
-        if len(df_clean) < len(df):
-            logging.warning(f"Removed {len(df) - len(df_clean)} rows with missing questions")
+        # Remove rows where both questions are missing or blank, in one mask
+        sub = sub[(sub['question_en'].str.len() > 0) | (sub['question_de'].str.len() > 0)]
         
-        # Convert to list of dictionaries
-        questions = []
-        for _, row in df_clean.iterrows():
-            question_en = str(row['question_en']).strip() if pd.notna(row['question_en']) else ""
-            question_de = str(row['question_de']).strip() if pd.notna(row['question_de']) else ""
-            
-            # Skip if both questions are empty
-            if not question_en and not question_de:
-                continue
-                
-            questions.append({
-                'question_en': question_en,
-                'question_de': question_de
-            })
-        
-        logging.info(f"Successfully parsed {len(questions)} valid questions")
+        if len(sub) < len(df):
+            logging.warning("Removed %s rows with missing questions", len(df) - len(sub))
+        
+        questions = sub.to_dict(orient='records')
+        
+        logging.info("Successfully parsed %s valid questions", len(questions))
         return questions
         
     except Exception as e:
-        logging.error(f"Error reading XLSX file: {e}")
+        logging.error("Error reading XLSX file: %s", e)
         raise
 
 
@@ -133,7 +192,7 @@ def store_questions_in_db(questions: List[Dict[str, str]], questions_manager: Qu
     """
     if clear_existing:
         count_deleted = questions_manager.clear_all_questions()
-        logging.info(f"Cleared {count_deleted} existing questions from the collection")
+        logging.info("Cleared %s existing questions from the collection", count_deleted)
     
     if not questions:
         logging.warning("No questions to store")
@@ -143,21 +202,21 @@ def store_questions_in_db(questions: List[Dict[str, str]], questions_manager: Qu
     if force_duplicates:
         # Use the original batch insert method (allows duplicates)
         inserted_ids = questions_manager.insert_questions_batch(questions)
-        logging.info(f"Successfully stored {len(inserted_ids)} questions in the database (duplicates allowed)")
+        logging.info("Successfully stored %s questions in the database (duplicates allowed)", len(inserted_ids))
     else:
         # Use the idempotent method (default behavior)
         result = questions_manager.insert_questions_batch_idempotent(questions)
         
         if result["inserted"] > 0:
-            logging.info(f"Successfully inserted {result['inserted']} new questions")
+            logging.info("Successfully inserted %s new questions", result['inserted'])
         if result["skipped"] > 0:
-            logging.info(f"Skipped {result['skipped']} duplicate questions")
+            logging.info("Skipped %s duplicate questions", result['skipped'])
         if result["inserted"] == 0 and result["skipped"] > 0:
             logging.info("All questions already exist in the database - no new questions inserted")
     
     # Show final statistics
     total_questions = questions_manager.count_questions()
-    logging.info(f"Total questions in collection: {total_questions}")
+    logging.info("Total questions in collection: %s", total_questions)
 
 
 def show_sample_questions(questions_manager: QuestionsManager, limit: int = 5) -> None:
@@ -204,8 +263,8 @@ def main():
     log_level = logging.DEBUG if args.verbose else logging.INFO
     setup_logging(log_level)
     
-    logging.info(f"Using database for embedding model: {EMBEDDING_MODEL}")
-    logging.info(f"Questions will be stored in database: oncopro")
+    logging.info("Using database for embedding model: %s", EMBEDDING_MODEL)
+    logging.info("Questions will be stored in database: oncopro")
     
     try:
         # Load questions from XLSX
@@ -229,13 +288,13 @@ def main():
         logging.info("Questions processing completed successfully")
         
     except FileNotFoundError as e:
-        logging.error(f"File error: {e}")
+        logging.error("File error: %s", e)
         sys.exit(1)
     except ValueError as e:
-        logging.error(f"Data error: {e}")
+        logging.error("Data error: %s", e)
         sys.exit(1)
     except Exception as e:
-        logging.error(f"Unexpected error: {e}")
+        logging.error("Unexpected error: %s", e)
         sys.exit(1)
 
 
@@ -12,33 +12,39 @@ def generate_wilcoxon_table(csv_file, out_tex="wilcoxon_ndcg10_table.tex"):
     for c in model_cols:
         df[c] = pd.to_numeric(df[c], errors="coerce")
 
-    # Pairwise Wilcoxon
+    # Pairwise Wilcoxon on one float matrix; each pair keeps the questions
+    # both models have scores for
+    arr = df[model_cols].to_numpy(dtype=np.float64)
+    observed = ~np.isnan(arr)
     pairs = []
     for i in range(len(model_cols)):
         for j in range(i+1, len(model_cols)):
             m1, m2 = model_cols[i], model_cols[j]
-            sub = df[[m1, m2]].dropna()
-            if len(sub) > 0:
+            mask = observed[:, i] & observed[:, j]
+            if mask.any():
                 try:
-                    stat, p = wilcoxon(sub[m1], sub[m2])
+                    stat, p = wilcoxon(arr[mask, i], arr[mask, j])
                 except ValueError:
                     p = 1.0  # fallback if all values equal
                 pairs.append((m1, m2, p))
 
     # FDR correction
-    pvals = [p for (_, _, p) in pairs]
-    reject, qvals, _, _ = smm.multipletests(pvals, alpha=0.05, method="fdr_bh")
+    if pairs:
+        model_a, model_b, pvals = zip(*pairs)
+        reject, qvals, _, _ = smm.multipletests(pvals, alpha=0.05, method="fdr_bh")
+    else:
+        # No two models share a scored question: write an empty table
+        model_a = model_b = pvals = qvals = ()
+        reject = np.zeros(0, dtype=bool)
 
-    # Build results
-    results = []
-    for (m1, m2, p), q, sig in zip(pairs, qvals, reject):
-        results.append({
-            "Model A": m1,
-            "Model B": m2,
-            "p": p,
-            "q": q,
-            "Significant at FDR 0.05?": "Yes" if sig else "No"
-        })
+    # Build results column-wise
+    results = {
+        "Model A": model_a,
+        "Model B": model_b,
+        "p": pvals,
+        "q": qvals,
+        "Significant at FDR 0.05?": np.where(reject, "Yes", "No"),
+    }
 
     df_results = pd.DataFrame(results).sort_values(by=["q", "p"]).reset_index(drop=True)
 
@@ -16,36 +16,43 @@ df = pd.read_csv(os.path.join(INDIR, "model_summary.csv"))
 # Pick a tidy set of columns for the paper
 wanted = ["P@5", "P@10", "Recall@10", "NDCG@5", "NDCG@10", "MRR", "MAP"]
 
-def format_ci(row, key):
-    m = row[f"{key}_mean"]
-    lo = row[f"{key}_ci_low"]
-    hi = row[f"{key}_ci_high"]
-    return f"{m:.3f} [{lo:.3f}–{hi:.3f}]"
-
-rows = []
-for _, r in df.iterrows():
-    row = {"Model": r["model"], "#Q": int(r["n_queries"])}
-    for k in wanted:
-        row[k] = format_ci(r, k)
-    rows.append(row)
-
-md = "| Model | #Q | " + " | ".join(wanted) + " |\n"
-md += "|" + " --- |" * (2 + len(wanted)) + "\n"
-for r in rows:
-    md += f"| {r['Model']} | {r['#Q']} | " + " | ".join(r[k] for k in wanted) + " |\n"
-
-with open(os.path.join(OUTDIR, "model_table.md"), "w") as f:
-    f.write(md)
+def fmt3(x): return f"{x:.3f}"
+
+# "mean [low–high]" strings, built one metric column at a time
+table = pd.DataFrame({"Model": df["model"], "#Q": df["n_queries"].astype(int)})
+for k in wanted:
+    table[k] = (
+        df[f"{k}_mean"].map(fmt3) + " ["
+        + df[f"{k}_ci_low"].map(fmt3) + "–"
+        + df[f"{k}_ci_high"].map(fmt3) + "]"
+    )
+rows = table.to_dict(orient="records")
+
+md_parts = [
+    "| Model | #Q | " + " | ".join(wanted) + " |\n",
+    "|" + " --- |" * (2 + len(wanted)) + "\n",
+]
+md_parts.extend(
+    f"| {r['Model']} | {r['#Q']} | " + " | ".join(r[k] for k in wanted) + " |\n"
+    for r in rows
+)
+
+with open(os.path.join(OUTDIR, "model_table.md"), "w", newline="") as f:
+    f.writelines(md_parts)
 
 # LaTeX
 def latex_escape(s): return s.replace("_", "\\_")
-latex = "\\begin{tabular}{l" + "r"*(1+len(wanted)) + "}\n\\toprule\n"
-latex += "Model & \\#Q & " + " & ".join(wanted) + " \\\\\n\\midrule\n"
-for r in rows:
-    latex += latex_escape(r["Model"]) + f" & {r['#Q']} & " + " & ".join(r[k] for k in wanted) + " \\\\\n"
-latex += "\\bottomrule\n\\end{tabular}\n"
-
-with open(os.path.join(OUTDIR, "model_table.tex"), "w") as f:
-    f.write(latex)
+latex_parts = [
+    "\\begin{tabular}{l" + "r"*(1+len(wanted)) + "}\n\\toprule\n",
+    "Model & \\#Q & " + " & ".join(wanted) + " \\\\\n\\midrule\n",
+]
+latex_parts.extend(
+    latex_escape(r["Model"]) + f" & {r['#Q']} & " + " & ".join(r[k] for k in wanted) + " \\\\\n"
+    for r in rows
+)
+latex_parts.append("\\bottomrule\n\\end{tabular}\n")
+
+with open(os.path.join(OUTDIR, "model_table.tex"), "w", newline="") as f:
+    f.writelines(latex_parts)
 
 print("[OK] Wrote tables/model_table.md and .tex")
@@ -4,6 +4,7 @@ OnCoPro embedding system.
 
 from .utils import (
     embed_text,
+    embed_texts,
     get_embedding_model,
     split_text_into_chunks,
     embed_text_using_jina_model,
@@ -32,6 +33,7 @@ from .database import (
     NodeDocument,
     QuestionsManager,
     AnswersManager,
+    EmbeddingCacheManager,
 )
 
 from .search import (
@@ -60,6 +62,7 @@ from .validation import (
 __all__ = [
     # Main functions
     "embed_text",
+    "embed_texts",
     "get_embedding_model", 
     "split_text_into_chunks",
     
@@ -79,6 +82,7 @@ __all__ = [
     "NodesManager",
     "NodeDocument",
     "QuestionsManager",
+    "EmbeddingCacheManager",
     
     # Search classes
     "SearchManager",
@@ -3,7 +3,7 @@ Database package for MongoDB operations.
 """
 
 from .client import MongoDBClient
-from .operations import NodesManager, QuestionsManager, AnswersManager
+from .operations import NodesManager, QuestionsManager, AnswersManager, EmbeddingCacheManager
 from .models import NodeDocument
 
 __all__ = [
@@ -12,4 +12,5 @@ __all__ = [
     "NodeDocument",
     "QuestionsManager",
     "AnswersManager",
+    "EmbeddingCacheManager",
 ]
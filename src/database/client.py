@@ -16,17 +16,25 @@ logger = logging.getLogger(__name__)
 class MongoDBClient:
     """MongoDB client wrapper for connection management."""
     
-    def __init__(self, uri: Optional[str] = None, database_name: Optional[str] = None):
+    def __init__(
+        self,
+        uri: Optional[str] = None,
+        database_name: Optional[str] = None,
+        mongo_client: Optional[MongoClient] = None
+    ):
         """
         Initialize MongoDB client.
         
         Args:
             uri: MongoDB connection URI. Defaults to settings.MONGO_URI
             database_name: Database name. Defaults to settings.DATABASE_NAME
+            mongo_client: Existing MongoClient to reuse. It is shared, so
+                close() leaves it open for its owner.
         """
         self.uri = uri or MONGO_URI
         self.database_name = database_name or DATABASE_NAME
-        self._client: Optional[MongoClient] = None
+        self._client: Optional[MongoClient] = mongo_client
+        self._owns_client = mongo_client is None
         self._database: Optional[Database] = None
         
     def connect(self) -> MongoClient:
@@ -64,6 +72,18 @@ class MongoDBClient:
             
         return self._database
     
+    def with_database(self, database_name: str) -> "MongoDBClient":
+        """
+        Get a client for another database on the same connection pool.
+        
+        Args:
+            database_name: Database name
+            
+        Returns:
+            MongoDBClient sharing this client's connection
+        """
+        return MongoDBClient(uri=self.uri, database_name=database_name, mongo_client=self.connect())
+    
     def get_collection(self, collection_name: str) -> Collection:
         """
         Get collection instance.
@@ -80,10 +100,13 @@ class MongoDBClient:
     def close(self) -> None:
         """Close the MongoDB connection."""
         if self._client:
-            self._client.close()
+            if self._owns_client:
+                self._client.close()
+                logger.info("MongoDB connection closed")
             self._client = None
             self._database = None
-            logger.info("MongoDB connection closed")
+            # A later connect() opens (and owns) a fresh client
+            self._owns_client = True
     
     def __enter__(self):
         """Context manager entry."""
@@ -5,7 +5,7 @@ from typing import Dict, List, Any, Optional
 from dataclasses import dataclass
 
 
-@dataclass
+@dataclass(slots=True)
 class NodeDocument:
     """Represents a node document in the MongoDB collection."""
     
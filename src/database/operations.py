@@ -1,10 +1,12 @@
 """
 Database operations for managing nodes and embeddings.
 """
+import hashlib
 import logging
-from typing import Iterator, Optional, List, Dict, Any, Union
+from typing import Iterator, Optional, List, Dict, Any, Tuple, Union
 from pymongo.collection import Collection
 from pymongo.cursor import Cursor
+from pymongo.errors import BulkWriteError
 from bson import ObjectId
 
 from .client import MongoDBClient
@@ -59,7 +61,9 @@ class NodesManager:
             NodeDocument instances without embeddings
         """
         filter_query = {"embedding": {"$exists": False}}
-        cursor = self.collection.find(filter_query)
+        # Only the fields NodeDocument.generate_text_content() reads
+        projection = {"text": 1, "richText": 1, "notes": 1, "links": 1, "attributes": 1}
+        cursor = self.collection.find(filter_query, projection)
         
         if batch_size:
             cursor = cursor.batch_size(batch_size)
@@ -119,12 +123,21 @@ class NodesManager:
                 for update in updates
             ]
             
-            result = self.collection.bulk_write(operations)
+            # Updates are independent, so an unordered write lets the server
+            # apply them in parallel and one failure does not stop the rest
+            result = self.collection.bulk_write(operations, ordered=False)
             updated_count = result.modified_count
             
             logger.info(f"Batch updated {updated_count} nodes with embeddings")
             return updated_count
             
+        except BulkWriteError as e:
+            updated_count = e.details.get("nModified", 0)
+            logger.error(
+                f"Batch update partially failed: {updated_count} updated, "
+                f"{len(e.details.get('writeErrors', []))} errors"
+            )
+            return updated_count
         except Exception as e:
             logger.error(f"Failed to batch update embeddings: {e}")
             return 0
@@ -144,13 +157,20 @@ class NodesManager:
             return NodeDocument.from_dict(doc)
         return None
     
-    def count_all_nodes(self) -> int:
+    def count_all_nodes(self, estimate: bool = False) -> int:
         """
         Count total number of nodes in the collection.
         
+        Args:
+            estimate: Read the count from collection metadata instead of
+                counting documents. Much faster on large collections, but
+                can be off after an unclean shutdown.
+        
         Returns:
             Total number of nodes
         """
+        if estimate:
+            return self.collection.estimated_document_count()
         return self.collection.count_documents({})
     
     def count_nodes_with_embeddings(self) -> int:
@@ -170,9 +190,11 @@ class NodesManager:
         Returns:
             Dictionary with collection statistics
         """
-        total_nodes = self.count_all_nodes()
+        # The metadata estimate saves a full count; only the embedding filter
+        # needs to scan
+        total_nodes = self.count_all_nodes(estimate=True)
         nodes_with_embeddings = self.count_nodes_with_embeddings()
-        nodes_without_embeddings = total_nodes - nodes_with_embeddings
+        nodes_without_embeddings = max(total_nodes - nodes_with_embeddings, 0)
         
         return {
             "total_nodes": total_nodes,
@@ -331,31 +353,30 @@ class QuestionsManager:
             logger.warning("No questions to insert")
             return {"inserted": 0, "skipped": 0, "total": 0}
         
-        # Get existing questions for efficient comparison
-        existing_questions = self.get_existing_questions_set()
-        logger.info(f"Found {len(existing_questions)} existing questions in collection")
-        
-        # Filter out duplicates
-        new_questions = []
-        skipped_count = 0
+        from pymongo import UpdateOne
+        
+        # Let the server skip duplicates: one unordered batch of upserts that only
+        # insert when no (question_en, question_de) match exists, instead of first
+        # fetching every stored question. The pair index keeps each upsert an index
+        # lookup; it is not unique because insert_questions_batch may add duplicates.
+        self.collection.create_index([("question_en", 1), ("question_de", 1)])
+        operations = [
+            UpdateOne(
+                {
+                    "question_en": question.get('question_en', ''),
+                    "question_de": question.get('question_de', ''),
+                },
+                {"$setOnInsert": question},
+                upsert=True,
+            )
+            for question in questions
+        ]
+        result = self.collection.bulk_write(operations, ordered=False)
         
-        for question in questions:
-            question_en = question.get('question_en', '')
-            question_de = question.get('question_de', '')
-            question_tuple = (question_en, question_de)
-            
-            if question_tuple in existing_questions:
-                skipped_count += 1
-                logger.debug(f"Skipping duplicate question: EN='{question_en[:50]}...', DE='{question_de[:50]}...'")
-            else:
-                new_questions.append(question)
-                existing_questions.add(question_tuple)  # Add to set to prevent duplicates within the batch
-        
-        # Insert only new questions
-        inserted_count = 0
-        if new_questions:
-            result = self.collection.insert_many(new_questions)
-            inserted_count = len(result.inserted_ids)
+        # Repeats within the batch match the copy upserted before them
+        inserted_count = result.upserted_count
+        skipped_count = len(questions) - inserted_count
+        if inserted_count > 0:
             logger.info(f"Inserted {inserted_count} new questions")
         
         if skipped_count > 0:
@@ -418,6 +439,18 @@ class AnswersManager:
         
         return self.collection.count_documents(query) > 0
     
+    def get_answered_question_ids(self, model_name: str) -> set:
+        """
+        Get the IDs of all questions that already have an answer for a model.
+        
+        Args:
+            model_name: Name of the embedding model
+            
+        Returns:
+            Set of question IDs
+        """
+        return set(self.collection.distinct("question_id", {"model_name": model_name}))
+    
     def insert_answer(self, question_id: Union[str, ObjectId], model_name: str, nodes: List[Dict[str, Any]]) -> Any:
         """
         Insert a single answer into the collection.
@@ -446,6 +479,40 @@ class AnswersManager:
         logger.info(f"Inserted answer with ID: {result.inserted_id}")
         return result.inserted_id
     
+    def insert_answers_batch(
+        self,
+        answers: List[Tuple[Union[str, ObjectId], List[Dict[str, Any]]]],
+        model_name: str
+    ) -> List[Any]:
+        """
+        Insert multiple answers with one unordered insert_many.
+        
+        Args:
+            answers: List of (question_id, nodes) pairs
+            model_name: Name of the embedding model
+            
+        Returns:
+            List of inserted document IDs
+        """
+        if not answers:
+            logger.warning("No answers to insert")
+            return []
+        
+        documents = [
+            {
+                "question_id": ObjectId(question_id) if isinstance(question_id, str) else question_id,
+                "model_name": model_name,
+                "nodes": nodes,
+                "ordered_nodes": [],
+                "completed": False
+            }
+            for question_id, nodes in answers
+        ]
+        
+        result = self.collection.insert_many(documents, ordered=False)
+        logger.info(f"Inserted {len(result.inserted_ids)} answers")
+        return result.inserted_ids
+    
     def count_answers(self, model_name: Optional[str] = None) -> int:
         """
         Count total number of answers in the collection.
@@ -522,3 +589,88 @@ class AnswersManager:
         }
         
         return stats
+
+
+class EmbeddingCacheManager:
+    """Manager class for the text-hash keyed embedding cache in MongoDB."""
+    
+    def __init__(self, client: Optional[MongoDBClient] = None, collection_name: str = "embedding_cache"):
+        """
+        Initialize EmbeddingCacheManager.
+        
+        Args:
+            client: MongoDBClient instance. If None, creates a new one.
+            collection_name: Name of the embedding cache collection
+        """
+        self.client = client or MongoDBClient()
+        self.collection_name = collection_name
+        self._collection: Optional[Collection] = None
+    
+    @property
+    def collection(self) -> Collection:
+        """Get the embedding cache collection."""
+        if self._collection is None:
+            self._collection = self.client.get_collection(self.collection_name)
+        return self._collection
+    
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        """
+        Build the cache key for a text embedded with a model.
+        
+        The model name is part of the key, so switching models never
+        returns another model's vectors. Whitespace is collapsed first: the
+        text is split into words before encoding, so texts that differ only
+        in spacing or line breaks get the same embedding and share a key.
+        
+        Args:
+            model_name: Name of the embedding model
+            text: Text that is embedded
+            
+        Returns:
+            Hex SHA-256 digest of the model name and normalized text
+        """
+        normalized = " ".join(text.split())
+        return hashlib.sha256(f"{model_name}\x00{normalized}".encode("utf-8")).hexdigest()
+    
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        """
+        Look up cached embeddings with a single query.
+        
+        Args:
+            keys: Cache keys from make_key()
+            
+        Returns:
+            Dictionary mapping each cached key to its embedding
+        """
+        if not keys:
+            return {}
+        cursor = self.collection.find({"_id": {"$in": list(set(keys))}}, {"embedding": 1})
+        return {doc["_id"]: doc["embedding"] for doc in cursor}
+    
+    def put_many(self, entries: Dict[str, List[float]]) -> int:
+        """
+        Store embeddings in the cache with one unordered bulk upsert.
+        
+        Args:
+            entries: Dictionary mapping cache keys to embeddings
+            
+        Returns:
+            Number of newly cached embeddings
+        """
+        if not entries:
+            return 0
+        
+        try:
+            from pymongo import UpdateOne
+            
+            operations = [
+                UpdateOne({"_id": key}, {"$set": {"embedding": embedding}}, upsert=True)
+                for key, embedding in entries.items()
+            ]
+            result = self.collection.bulk_write(operations, ordered=False)
+            return result.upserted_count
+            
+        except Exception as e:
+            logger.error(f"Failed to write {len(entries)} embeddings to the cache: {e}")
+            return 0
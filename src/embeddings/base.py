@@ -107,15 +107,29 @@ class EmbeddingModel(ABC):
         
         This method should be overridden by subclasses that need special handling.
         """
-        # Use a simple chunking approach directly here to avoid circular imports
-        # This keeps the base class self-contained
-        max_words = 6000  # Conservative default
-        words = text.split()
+        return self.embed_batch([text], **kwargs)[0]
+    
+    def embed_batch(self, texts: List[str], batch_size: int = 32, max_words: int = 6000, **kwargs) -> List[List[float]]:
+        """
+        Embed several texts with batched forward passes.
+        Chunks from all texts are encoded together, then mean pooled per text,
+        so each result matches embed_text() for the same input.
+        
+        Texts are split into chunks of at most max_words words (the default is
+        a conservative limit that avoids importing the configured MAX_WORDS
+        here). Empty or whitespace-only texts are encoded as one empty chunk,
+        so there is always one vector per input.
+        """
+        if not texts:
+            return []
+        
         chunks = []
-        for i in range(0, len(words), max_words):
-            chunk = ' '.join(words[i:i + max_words])
-            chunks.append(chunk)
+        chunk_counts = []
+        for text in texts:
+            words = text.split()
+            text_chunks = [' '.join(words[i:i + max_words]) for i in range(0, len(words), max_words)] or [""]
+            chunks.extend(text_chunks)
+            chunk_counts.append(len(text_chunks))
         
-        embeddings = self.encode_chunks(chunks, **kwargs)
-        avg_embedding = embeddings.mean(dim=0).cpu().tolist()
-        return avg_embedding
+        embeddings = self.encode_chunks(chunks, batch_size=batch_size, **kwargs)
+        return [text_embeddings.mean(dim=0).cpu().tolist() for text_embeddings in torch.split(embeddings, chunk_counts)]
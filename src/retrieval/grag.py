@@ -15,6 +15,7 @@ metadata that describes how each node was selected from the graph.
 from __future__ import annotations
 
 import logging
+import threading
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
@@ -32,6 +33,12 @@ logger = logging.getLogger(__name__)
 # Configuration
 # ---------------------------------------------------------------------------
 
+_EMBEDDING_DTYPES = {
+    "float32": torch.float32,
+    "float16": torch.float16,
+    "bfloat16": torch.bfloat16,
+}
+
 
 @dataclass(frozen=True)
 class GragConfig:
@@ -51,6 +58,10 @@ class GragConfig:
         max_context_neighbors: Maximum number of neighboring nodes to include
             in the contextual metadata returned with each hit.
         debug_logging: Enable verbose logging to help tune the retrieval flow.
+        embedding_dtype: Storage type of the cached, normalised node embedding
+            matrix (``"float32"``, ``"float16"`` or ``"bfloat16"``).  The
+            half-precision types halve the index memory and the bytes read
+            per query at a small cost in score precision.
     """
 
     hops: int = 2
@@ -62,6 +73,7 @@ class GragConfig:
     cache_ttl_seconds: Optional[float] = 15 * 60
     max_context_neighbors: int = 6
     debug_logging: bool = False
+    embedding_dtype: str = "float32"
 
     def __post_init__(self) -> None:
         if self.hops < 0:
@@ -80,6 +92,8 @@ class GragConfig:
             raise ValueError("hop_decay must be in (0, 1]")
         if self.max_context_neighbors < 0:
             raise ValueError("max_context_neighbors must be >= 0")
+        if self.embedding_dtype not in _EMBEDDING_DTYPES:
+            raise ValueError(f"embedding_dtype must be one of {sorted(_EMBEDDING_DTYPES)}")
 
 
 # ---------------------------------------------------------------------------
@@ -172,8 +186,9 @@ class GraphIndex:
         "category": 1,
     }
 
-    def __init__(self, collection: Collection):
+    def __init__(self, collection: Collection, dtype: torch.dtype = torch.float32):
         self._collection = collection
+        self._dtype = dtype
         self._nodes: List[GraphNode] = []
         self._id_to_index: Dict[Any, int] = {}
         self._nodeid_to_index: Dict[str, int] = {}
@@ -250,8 +265,14 @@ class GraphIndex:
     def _build_index(self) -> None:
         """Populate nodes, embeddings and structural edges from MongoDB."""
 
-        cursor = self._collection.find({"embedding": {"$exists": True}}, self._PROJECTION)
-        embeddings: List[np.ndarray] = []
+        query = {"embedding": {"$exists": True}}
+        # Rows are written straight into one preallocated float32 matrix instead
+        # of collecting per-node arrays and stacking them. The collection size
+        # from metadata is only a hint: no extra count query, and the matrix
+        # doubles if it runs out.
+        capacity = self._collection.estimated_document_count()
+        cursor = self._collection.find(query, self._PROJECTION)
+        embedding_matrix: Optional[np.ndarray] = None
         relation_queue: List[Tuple[Any, Any, str]] = []
 
         for record in cursor:
@@ -265,6 +286,7 @@ class GraphIndex:
 
             if self._embedding_dim is None:
                 self._embedding_dim = embedding_array.shape[0]
+                embedding_matrix = np.empty((max(capacity, 1), self._embedding_dim), dtype=np.float32)
             elif embedding_array.shape[0] != self._embedding_dim:
                 logger.warning(
                     "Skipping node %s due to mismatched embedding dimension (expected %s, got %s)",
@@ -295,7 +317,9 @@ class GraphIndex:
             self._nodes.append(node)
             self._id_to_index[record.get("_id")] = node_index
             self._nodeid_to_index[nodeid] = node_index
-            embeddings.append(embedding_array)
+            if node_index == len(embedding_matrix):  # hint was too low
+                embedding_matrix = np.concatenate([embedding_matrix, np.empty_like(embedding_matrix)])
+            embedding_matrix[node_index] = embedding_array
 
             relation_queue.extend(self._collect_relations(record, node.object_id))
 
@@ -305,9 +329,9 @@ class GraphIndex:
             self._stats = {"total_nodes": 0, "total_edges": 0}
             return
 
-        embedding_matrix = np.vstack(embeddings)
-        tensor = torch.from_numpy(embedding_matrix)
-        self._embedding_matrix = F.normalize(tensor, dim=1, eps=1e-12)
+        tensor = torch.from_numpy(embedding_matrix[: len(self._nodes)])
+        # Normalise in float32, then store in the configured precision
+        self._embedding_matrix = F.normalize(tensor, dim=1, eps=1e-12).to(self._dtype)
 
         self._graph.add_nodes_from(range(len(self._nodes)))
         for src, dst, relation in relation_queue:
@@ -387,29 +411,34 @@ class GragRetriever:
         collection: Collection,
         embed_function: Callable[[str], List[float]],
         config: Optional[GragConfig] = None,
+        embed_batch_function: Optional[Callable[[List[str]], List[List[float]]]] = None,
     ) -> None:
         self._collection = collection
         self._embed_function = embed_function
+        self._embed_batch_function = embed_batch_function
         self._config = config or GragConfig()
         self._index: Optional[GraphIndex] = None
         self._last_built_at: Optional[datetime] = None
+        self._refresh_lock = threading.Lock()
 
     # ------------------------------------------------------------------
     # Index lifecycle
     # ------------------------------------------------------------------
 
     def refresh_index(self, force: bool = False) -> None:
-        if self._index is not None and not force:
-            if self._config.cache_ttl_seconds is None:
-                return
-            if self._last_built_at is not None:
-                elapsed = (datetime.now(timezone.utc) - self._last_built_at).total_seconds()
-                if elapsed < self._config.cache_ttl_seconds:
+        # Serialised so concurrent searches never rebuild the index twice
+        with self._refresh_lock:
+            if self._index is not None and not force:
+                if self._config.cache_ttl_seconds is None:
                     return
-        if self._config.debug_logging:
-            logger.debug("Rebuilding GRAG index (force=%s)", force)
-        self._index = GraphIndex(self._collection)
-        self._last_built_at = datetime.now(timezone.utc)
+                if self._last_built_at is not None:
+                    elapsed = (datetime.now(timezone.utc) - self._last_built_at).total_seconds()
+                    if elapsed < self._config.cache_ttl_seconds:
+                        return
+            if self._config.debug_logging:
+                logger.debug("Rebuilding GRAG index (force=%s)", force)
+            self._index = GraphIndex(self._collection, dtype=_EMBEDDING_DTYPES[self._config.embedding_dtype])
+            self._last_built_at = datetime.now(timezone.utc)
 
     def _ensure_index(self) -> GraphIndex:
         if self._index is None:
@@ -450,6 +479,49 @@ class GragRetriever:
 
         query_vector = self._embed_query(query, index.embedding_dim, index.node_embeddings.dtype)
         node_similarities = torch.matmul(index.node_embeddings, query_vector)
+        return self._rank(index, query_vector, node_similarities, top_k, threshold)
+
+    def retrieve_batch(self, queries: List[str], top_k: int = 5, threshold: float = 0.0) -> List[List[Dict[str, Any]]]:
+        """Run :meth:`retrieve` for several queries at once.
+
+        The queries are embedded in one batch (when an ``embed_batch_function``
+        was given) and scored against every node with a single matrix product;
+        graph expansion then runs per query.
+        """
+
+        queries = [(query or "").strip() for query in queries]
+        if not all(queries):
+            raise ValueError("Query must be a non-empty string")
+        if not queries:
+            return []
+
+        index = self._ensure_index()
+        if index.num_nodes == 0:
+            return [[] for _ in queries]
+
+        if self._embed_batch_function is not None:
+            embeddings = self._embed_batch_function(queries)
+        else:
+            embeddings = [self._embed_function(query) for query in queries]
+        query_vectors = [
+            self._to_query_vector(embedding, index.embedding_dim, index.node_embeddings.dtype)
+            for embedding in embeddings
+        ]
+        similarity_matrix = torch.matmul(index.node_embeddings, torch.stack(query_vectors, dim=1))
+        return [
+            self._rank(index, query_vector, similarity_matrix[:, i], top_k, threshold)
+            for i, query_vector in enumerate(query_vectors)
+        ]
+
+    def _rank(
+        self,
+        index: GraphIndex,
+        query_vector: torch.Tensor,
+        node_similarities: torch.Tensor,
+        top_k: int,
+        threshold: float,
+    ) -> List[Dict[str, Any]]:
+        """Expand seed subgraphs and score candidates for one embedded query."""
 
         seeds = min(index.num_nodes, max(top_k, self._config.seed_top_k))
         seed_scores, seed_indices = torch.topk(node_similarities, seeds)
@@ -489,18 +561,25 @@ class GragRetriever:
                         "local_similarity": node_score,
                     }
 
-        # Ensure every candidate has at least its direct similarity score
-        for idx in candidate_indices:
-            if final_scores[idx] < node_similarities[idx]:
-                final_scores[idx] = float(node_similarities[idx])
-
-        if not candidate_indices:
-            candidate_indices = set(seed_indices.tolist())
-            for idx in candidate_indices:
-                final_scores[idx] = float(node_similarities[idx])
+        if candidate_indices:
+            candidates = torch.tensor(list(candidate_indices), dtype=torch.long)
+            # Ensure every candidate has at least its direct similarity score
+            final_scores[candidates] = torch.maximum(final_scores[candidates], node_similarities[candidates])
+        else:
+            candidates = seed_indices
+            final_scores[candidates] = node_similarities[candidates]
 
+        # Keep the best max_candidates by partitioning on the cut-off score, then
+        # stable-sort only those; ties keep candidate order as a sorted() would
         max_candidates = min(index.num_nodes, int(max(top_k, top_k * self._config.candidate_multiplier)))
-        ordered_candidates = sorted(candidate_indices, key=lambda i: final_scores[i], reverse=True)[:max_candidates]
+        candidates = candidates.numpy()
+        candidate_scores = final_scores[candidates].numpy()
+        if len(candidates) > max_candidates:
+            cut = len(candidates) - max_candidates
+            keep = np.flatnonzero(candidate_scores >= np.partition(candidate_scores, cut)[cut])
+            candidates, candidate_scores = candidates[keep], candidate_scores[keep]
+        order = np.argsort(-candidate_scores, kind="stable")[:max_candidates]
+        ordered_candidates = candidates[order].tolist()
 
         results: List[Dict[str, Any]] = []
         for idx in ordered_candidates:
@@ -529,7 +608,10 @@ class GragRetriever:
     # ------------------------------------------------------------------
 
     def _embed_query(self, query: str, expected_dim: int, dtype: torch.dtype) -> torch.Tensor:
-        embedding = self._embed_function(query)
+        return self._to_query_vector(self._embed_function(query), expected_dim, dtype)
+
+    @staticmethod
+    def _to_query_vector(embedding: Optional[List[float]], expected_dim: int, dtype: torch.dtype) -> torch.Tensor:
         if embedding is None:
             raise RuntimeError("Embedding function returned None")
         vector = torch.as_tensor(embedding, dtype=dtype)
@@ -544,8 +626,9 @@ class GragRetriever:
     @staticmethod
     def _compute_subgraph_embedding(index: GraphIndex, node_indices: List[int]) -> torch.Tensor:
         nodes_tensor = index.node_embeddings[node_indices]
-        pooled = nodes_tensor.mean(dim=0)
-        return F.normalize(pooled, dim=0, eps=1e-12)
+        # Pool in float32 even when the index is stored in half precision
+        pooled = nodes_tensor.float().mean(dim=0)
+        return F.normalize(pooled, dim=0, eps=1e-12).to(nodes_tensor.dtype)
 
 
 __all__ = ["GragConfig", "GragRetriever", "GraphIndex", "GraphNode"]
@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import logging
+import threading
 from typing import Any, Dict, List, Optional, Sequence
 
 from pymongo.collection import Collection
@@ -9,7 +10,7 @@ from pymongo.collection import Collection
 from .config import EMBEDDING_MODEL
 from .database import MongoDBClient
 from .retrieval import GragConfig, GragRetriever
-from .utils import embed_text, get_embedding_model
+from .utils import embed_text, embed_texts, get_embedding_model
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +34,7 @@ class SearchManager:
         self._retriever: Optional[GragRetriever] = None
         self._grag_config = grag_config or GragConfig()
         self._auto_refresh = auto_refresh
+        self._retriever_lock = threading.Lock()
 
     # ------------------------------------------------------------------
     # Lazy properties
@@ -53,20 +55,35 @@ class SearchManager:
     @property
     def retriever(self) -> GragRetriever:
         if self._retriever is None:
-            self._retriever = GragRetriever(
-                collection=self.collection,
-                embed_function=embed_text,
-                config=self._grag_config,
-            )
+            self._build_retriever()
         elif self._auto_refresh:
             # Refresh lazily to avoid rebuilding the graph on every request
             self._retriever.refresh_index(force=False)
         return self._retriever
 
+    def _build_retriever(self) -> None:
+        """Create the retriever (and its graph index) once, even under concurrent callers."""
+        with self._retriever_lock:
+            if self._retriever is None:
+                self._retriever = GragRetriever(
+                    collection=self.collection,
+                    embed_function=embed_text,
+                    config=self._grag_config,
+                    embed_batch_function=embed_texts,
+                )
+
     # ------------------------------------------------------------------
     # Introspection
     # ------------------------------------------------------------------
 
+    def warm_up(self) -> None:
+        """Load the embedding model and build the graph index ahead of the first search."""
+        if self._embedding_model is None:
+            self._embedding_model = get_embedding_model(self.embedding_model_name)
+        self._build_retriever()
+        # Builds the index if it does not exist yet, otherwise a no-op within the TTL
+        self._retriever.refresh_index(force=False)
+
     def refresh_index(self, force: bool = True) -> None:
         """Force a rebuild of the cached graph index."""
         self.retriever.refresh_index(force=force)
@@ -102,11 +119,23 @@ class SearchManager:
             logger.exception("GRAG search failed: %s", exc)
             raise
 
+    def search_many(self, queries: Sequence[str], top_k: int = 5, threshold: float = 0.0) -> List[List[Dict[str, Any]]]:
+        """Search several queries with one batched embedding and similarity pass."""
+        try:
+            return self.retriever.retrieve_batch(list(queries), top_k=top_k, threshold=threshold)
+        except Exception as exc:
+            logger.exception("GRAG batch search failed: %s", exc)
+            raise
+
     # Backwards compatibility for older callers --------------------------------
     def cosine_search(self, query: str, top_k: int = 5, threshold: float = 0.0) -> List[Dict[str, Any]]:
         """Alias retained for compatibility with historical code paths."""
         return self.search(query, top_k=top_k, threshold=threshold)
 
+    def cosine_search_batch(self, queries: Sequence[str], top_k: int = 5, threshold: float = 0.0) -> List[List[Dict[str, Any]]]:
+        """Batched counterpart of :meth:`cosine_search`."""
+        return self.search_many(queries, top_k=top_k, threshold=threshold)
+
     def search_by_content(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
         return self.search(query, top_k=top_k)
 
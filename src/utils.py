@@ -1,6 +1,7 @@
 """
 Utility functions for text processing and embedding operations.
 """
+import threading
 from typing import List, Optional
 
 from .config import MAX_WORDS, EMBEDDING_MODEL
@@ -29,6 +30,9 @@ def split_text_into_chunks(text: str, max_words: int = MAX_WORDS) -> List[str]:
 # Global embedding model instance
 _embedding_model: Optional[EmbeddingModel] = None
 
+# Guards loading and calling the shared model: tokenizers are not thread-safe
+_model_lock = threading.Lock()
+
 
 def get_embedding_model(model_name: Optional[str] = None, force_reload: bool = False) -> EmbeddingModel:
     """
@@ -46,11 +50,12 @@ def get_embedding_model(model_name: Optional[str] = None, force_reload: bool = F
     if model_name is None:
         model_name = EMBEDDING_MODEL
     
-    if _embedding_model is None or force_reload:
-        _embedding_model = EmbeddingModelFactory.create_model(model_name)
-        _embedding_model.load_with_retry()
-    
-    return _embedding_model
+    with _model_lock:
+        if _embedding_model is None or force_reload:
+            _embedding_model = EmbeddingModelFactory.create_model(model_name)
+            _embedding_model.load_with_retry()
+        
+        return _embedding_model
 
 
 def embed_text(text: str, model_name: Optional[str] = None, **kwargs) -> List[float]:
@@ -68,15 +73,33 @@ def embed_text(text: str, model_name: Optional[str] = None, **kwargs) -> List[fl
     Returns:
         List of floats representing the embedding vector
     """
-    # For the high-level embed_text function, we want to use proper chunking
-    # so we override the model's basic embed_text method
+    return embed_texts([text], model_name, **kwargs)[0]
+
+
+def embed_texts(texts: List[str], model_name: Optional[str] = None, **kwargs) -> List[List[float]]:
+    """
+    Embed several texts with one batched encode call.
+    
+    Chunks from all texts are encoded together, then mean pooled per text,
+    so each result matches embed_text() for the same input. Empty texts
+    still get a vector.
+    
+    Args:
+        texts: Texts to embed
+        model_name: Name of the model to use. If None, uses default.
+        **kwargs: Additional arguments passed to the model's encode_chunks method
+    
+    Returns:
+        One embedding vector per input text
+    """
+    if not texts:
+        return []
+    
     model = get_embedding_model(model_name)
     
-    # Use the proper chunking from utils
-    chunks = split_text_into_chunks(text)
-    embeddings = model.encode_chunks(chunks, **kwargs)
-    avg_embedding = embeddings.mean(dim=0).cpu().tolist()
-    return avg_embedding
+    # Chunk with the configured MAX_WORDS, as split_text_into_chunks() does
+    with _model_lock:
+        return model.embed_batch(texts, max_words=MAX_WORDS, **kwargs)
 
 
 # Backward compatibility functions
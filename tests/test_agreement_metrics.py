@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Regression tests for Cohen's kappa and Krippendorff's alpha in agreement_metrics.py.
+
+Expected values are computed by hand; the alpha fixtures include missing
+ratings, a unit with a single rating and an unrated unit, and run through
+both the NumPy path and the numba path (when numba is installed).
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+import agreement_metrics
+from agreement_metrics import compute_pairwise_kappa, krippendorffs_alpha_nominal
+
+
+NAN = np.nan
+
+# (raters x units). Complete two-rater data: the units disagree once, so
+# Do = 2 / 8 and De = (3 * 5 + 5 * 3) / (8 * 7), alpha = 8 / 15.
+ALPHA_COMPLETE = np.array([
+    [1, 1, 2, 2],
+    [1, 2, 2, 2],
+], dtype=float)
+
+# Same units plus one rated by a single rater and one nobody rated. The single
+# rating does not change Do but, in this implementation, counts towards the
+# category totals for De: totals 1:4, 2:5, De = 40 / 72, alpha = 0.55.
+# (Textbook Krippendorff alpha drops unpairable values and would stay at 8/15.)
+ALPHA_MISSING = np.array([
+    [1, 1, 2, 2, 1, NAN],
+    [1, 2, 2, 2, NAN, NAN],
+])
+
+
+def _alpha_cases():
+    return [
+        (ALPHA_COMPLETE, 8 / 15),
+        (ALPHA_MISSING, 0.55),
+    ]
+
+
+def _check_alpha():
+    for data, expected in _alpha_cases():
+        assert math.isclose(krippendorffs_alpha_nominal(data), expected), (data, expected)
+        # (units x raters) layout gives the same value
+        assert math.isclose(krippendorffs_alpha_nominal(data.T, units_axis=0), expected)
+
+
+def test_alpha_numpy():
+    """The count-matrix path reproduces the hand-computed alphas."""
+    _check_alpha()
+
+
+def test_alpha_numba():
+    """The numba kernel (forced on with a zero threshold) matches as well."""
+    if agreement_metrics.njit is None:
+        print("numba not installed, skipping")
+        return
+    threshold = agreement_metrics.ALPHA_NUMBA_MIN_CELLS
+    agreement_metrics.ALPHA_NUMBA_MIN_CELLS = 0
+    try:
+        _check_alpha()
+    finally:
+        agreement_metrics.ALPHA_NUMBA_MIN_CELLS = threshold
+
+
+def test_alpha_degenerate():
+    """Edge cases: no data, one category, no unit with two ratings."""
+    assert math.isnan(krippendorffs_alpha_nominal(np.empty((0, 0))))
+    assert math.isnan(krippendorffs_alpha_nominal(np.full((2, 3), NAN)))
+    assert krippendorffs_alpha_nominal(np.array([[1, 1], [1, NAN]])) == 1.0
+    assert math.isnan(krippendorffs_alpha_nominal(np.array([[1, NAN], [NAN, 2]])))
+
+
+def _kappa_matrix() -> pd.DataFrame:
+    """
+    A and B: the textbook 2x2 table (20 yes/yes, 5 yes/no, 10 no/yes, 15 no/no),
+    p_o = 0.7, p_e = 0.5, kappa = 0.4, plus 5 units only A rated.
+    C copies A on units 0-9 and 20-29, so kappa(A, C) = 1 and, against B,
+    p_o = 0.5, p_e = 0.625, kappa = -1/3.
+    D only rated a unit nobody else did, so it forms no pair.
+    """
+    a = [1] * 25 + [0] * 25 + [1] * 5 + [NAN]
+    b = [1] * 20 + [0] * 5 + [1] * 10 + [0] * 15 + [NAN] * 5 + [NAN]
+    c = [NAN] * 56
+    for unit in list(range(10)) + list(range(20, 30)):
+        c[unit] = a[unit]
+    d = [NAN] * 55 + [1]
+    return pd.DataFrame({"A": a, "B": b, "C": c, "D": d})
+
+
+def test_pairwise_kappa():
+    """Kappa uses only the units both annotators rated."""
+    kappas = compute_pairwise_kappa(_kappa_matrix())
+    assert set(kappas) == {("A", "B"), ("A", "C"), ("B", "C")}
+    assert math.isclose(kappas[("A", "B")], 0.4)
+    assert math.isclose(kappas[("A", "C")], 1.0)
+    assert math.isclose(kappas[("B", "C")], -1 / 3)
+
+
+def test_pairwise_kappa_single_category():
+    """Kappa is undefined (NaN) when both annotators only use one label."""
+    kappas = compute_pairwise_kappa(pd.DataFrame({"A": [1.0, 1.0], "B": [1.0, 1.0]}))
+    assert math.isnan(kappas[("A", "B")])
+    assert compute_pairwise_kappa(pd.DataFrame({"A": [1.0]})) == {}
+
+
+def main():
+    """Run all agreement metric tests."""
+    tests = [
+        test_alpha_numpy,
+        test_alpha_numba,
+        test_alpha_degenerate,
+        test_pairwise_kappa,
+        test_pairwise_kappa_single_category,
+    ]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
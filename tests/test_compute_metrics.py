@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Regression tests for the IR metrics in compute_metrics.py.
+
+Expected values are computed by hand for a small fixture, and both the
+padded NumPy path and the numba path (when numba is installed) are checked
+against them.
+"""
+import math
+
+import numpy as np
+
+import compute_metrics
+from compute_metrics import aggregate_with_ci, evaluate_queries, metric_names
+
+
+K_LIST = [1, 3, 5]
+
+# q1 retrieves grades [2, 0, 1, -1] and misses one relevant node ("e"), so
+# 3 nodes are relevant; q2 retrieves nothing relevant; q3 has no relevant
+# node in its qrels and must be left out.
+RUNS = {
+    "q1": [(1, "a"), (2, "b"), (3, "c"), (4, "d")],
+    "q2": [(1, "x"), (2, "y")],
+    "q3": [(1, "a")],
+}
+QRELS = {
+    "q1": {"a": 2, "b": 0, "c": 1, "d": -1, "e": 1},
+    "q2": {"z": 1},
+    "q3": {"a": 0},
+}
+TOTAL_REL = {"q1": 3, "q2": 1, "q3": 0}
+
+# Discounts 1/log2(rank + 1) and gains 2^rel - 1 for q1
+_D = [1.0 / math.log2(r + 1) for r in range(1, 6)]
+_DCG5 = 3 * _D[0] + 0 * _D[1] + 1 * _D[2] - 0.5 * _D[3]
+_IDCG3 = 3 * _D[0] + 1 * _D[1] + 0 * _D[2]
+_IDCG5 = _IDCG3 - 0.5 * _D[3]
+
+EXPECTED_Q1 = {
+    "P@1": 1.0, "P@3": 2 / 3, "P@5": 2 / 5,
+    "Recall@1": 1 / 3, "Recall@3": 2 / 3, "Recall@5": 2 / 3,
+    "NDCG@1": 1.0, "NDCG@3": (3 + 0.5) / _IDCG3, "NDCG@5": _DCG5 / _IDCG5,
+    "MRR": 1.0,
+    "MAP": (1 / 1 + 2 / 3) / 2,
+}
+
+
+def _check_fixture_scores():
+    qids, scores = evaluate_queries(RUNS, QRELS, TOTAL_REL, K_LIST, pos_min=1)
+    assert qids == ["q1", "q2"], qids
+    names = metric_names(K_LIST)
+    expected = np.array([[EXPECTED_Q1[name] for name in names], [0.0] * len(names)])
+    # DCG is summed in float32
+    np.testing.assert_allclose(scores, expected, rtol=1e-6, atol=1e-7)
+
+
+def test_evaluate_queries_numpy():
+    """The padded NumPy path reproduces the hand-computed metrics."""
+    _check_fixture_scores()
+
+
+def test_evaluate_queries_numba():
+    """The numba path (forced on with a zero threshold) matches as well."""
+    if compute_metrics.njit is None:
+        print("numba not installed, skipping")
+        return
+    threshold = compute_metrics.EVAL_NUMBA_MIN_CELLS
+    compute_metrics.EVAL_NUMBA_MIN_CELLS = 0
+    try:
+        _check_fixture_scores()
+    finally:
+        compute_metrics.EVAL_NUMBA_MIN_CELLS = threshold
+
+
+def test_evaluate_queries_no_relevant():
+    """Queries without any relevant qrels produce an empty score matrix."""
+    qids, scores = evaluate_queries({"q3": RUNS["q3"]}, QRELS, TOTAL_REL, K_LIST, pos_min=1)
+    assert qids == []
+    assert scores.shape == (0, 3 * len(K_LIST) + 2)
+
+
+def test_aggregate_normal_ci():
+    """Without bootstrap, the CI is mean +/- 1.96 * sd / sqrt(n)."""
+    scores = np.array([[0.0, 0.5], [1.0, 0.5], [0.0, 0.5], [1.0, 0.5]])
+    means, cis = aggregate_with_ci(scores, ["a", "b"], bootstrap=0)
+    half_width = 1.96 * math.sqrt(1 / 3) / 2
+    assert means == {"a": 0.5, "b": 0.5}
+    assert np.allclose(cis["a"], (0.5 - half_width, 0.5 + half_width))
+    assert cis["b"] == (0.5, 0.5)
+
+
+def _reference_bootstrap(values, bootstrap, seed=0):
+    """Plain resample-the-queries bootstrap, one metric at a time."""
+    rng = np.random.default_rng(seed)
+    n = len(values)
+    samples = [values[rng.integers(0, n, size=n)].mean() for _ in range(bootstrap)]
+    return np.percentile(samples, [2.5, 97.5])
+
+
+def test_aggregate_bootstrap_ci():
+    """Both bootstrap paths agree with a reference bootstrap on a fixed fixture."""
+    values = np.arange(20, dtype=np.float64) / 19.0
+    scores = np.column_stack([values, np.full(20, 0.25)])
+    reference = _reference_bootstrap(values, 4000)
+
+    max_cells = compute_metrics.BOOTSTRAP_MAX_WEIGHT_CELLS
+    try:
+        for cells in (max_cells, 0):  # multinomial matmul, then batched gather
+            compute_metrics.BOOTSTRAP_MAX_WEIGHT_CELLS = cells
+            means, cis = aggregate_with_ci(scores, ["a", "b"], bootstrap=4000)
+            assert math.isclose(means["a"], 0.5)
+            # Different draws, same distribution: allow Monte Carlo error
+            assert np.allclose(cis["a"], reference, atol=0.02), (cells, cis["a"], reference)
+            # A constant metric has a degenerate interval
+            assert np.allclose(cis["b"], (0.25, 0.25))
+    finally:
+        compute_metrics.BOOTSTRAP_MAX_WEIGHT_CELLS = max_cells
+
+
+def test_aggregate_empty():
+    """No evaluated queries gives no means and no CIs."""
+    assert aggregate_with_ci(np.empty((0, 2)), ["a", "b"]) == ({}, {})
+
+
+def main():
+    """Run all metric regression tests."""
+    tests = [
+        test_evaluate_queries_numpy,
+        test_evaluate_queries_numba,
+        test_evaluate_queries_no_relevant,
+        test_aggregate_normal_ci,
+        test_aggregate_bootstrap_ci,
+        test_aggregate_empty,
+    ]
+    for test in tests:
+        test()
+        print(f"✅ {test.__name__}")
+
+
+if __name__ == "__main__":
+    main()
@@ -42,12 +42,22 @@ def show_sample_nodes(nodes_manager: NodesManager, limit: int = 5, with_embeddin
     print(f"\n{title}")
     print("=" * len(title))
     
-    cursor = collection.find(filter_query).limit(limit)
+    # Only the text preview and the embedding length are shown, so compute them
+    # server-side rather than transferring whole documents with their embeddings
+    cursor = collection.aggregate([
+        {"$match": filter_query},
+        {"$limit": limit},
+        {"$project": {
+            "text": {"$substrCP": [{"$ifNull": ["$text", ""]}, 0, 100]},
+            "text_len": {"$strLenCP": {"$ifNull": ["$text", ""]}},
+            "embedding_dim": {"$cond": [{"$isArray": "$embedding"}, {"$size": "$embedding"}, 0]},
+        }},
+    ])
     
     for i, doc in enumerate(cursor, 1):
         node_id = doc.get('_id')
-        text = (doc.get('text') or '')[:100] + '...' if len(doc.get('text', '')) > 100 else doc.get('text', '')
-        embedding_dim = len(doc.get('embedding', [])) if doc.get('embedding') else 0
+        text = doc['text'] + '...' if doc['text_len'] > 100 else doc['text']
+        embedding_dim = doc['embedding_dim']
         
         print(f"{i}. ID: {node_id}")
         print(f"   Text: {text}")